@@ -0,0 +1,294 @@
+# benchmarks/mock_openai_server.py
+
+import email.parser
+import email.policy
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.models import OpenAIResponse, StudyCard
+
+_WORDS = ("cell membrane enzyme protein gradient energy transport diffusion osmosis receptor signal pathway "
+          "equation matrix vector integral limit series function theorem proof lemma graph network layer "
+          "market price demand supply elasticity cost revenue margin contract liability court statute").split()
+
+
+class MockServerConfig(BaseModel):
+    """
+    Behaviour of the mock OpenAI server.
+
+    Attributes:
+        latency_ms (float): Minimum latency of a chat completion.
+        latency_jitter_ms (float): Mean of the exponentially distributed extra latency, which gives the
+            long tail real APIs have.
+        rate_limit_probability (float): Probability that a chat completion is answered with a 429.
+        retry_after_ms (int): Retry delay advertised with every 429.
+        cards_per_part (int): Study cards returned for every content part of a request.
+        batch_duration_s (float): Time a batch job takes from submission to completion.
+    """
+    latency_ms: float = Field(default=200.0, ge=0)
+    latency_jitter_ms: float = Field(default=100.0, ge=0)
+    rate_limit_probability: float = Field(default=0.0, ge=0, le=1)
+    retry_after_ms: int = Field(default=200, ge=0)
+    cards_per_part: int = Field(default=2, ge=0)
+    batch_duration_s: float = Field(default=1.0, ge=0)
+
+
+class MockServerStats(BaseModel):
+    """Traffic the mock server received since its statistics were last reset."""
+    chat_requests: int = 0
+    rate_limited: int = 0
+    batch_tasks: int = 0
+    bytes_uploaded: int = 0
+
+
+class MockOpenAIServer:
+    """
+    Local stand-in for the parts of the OpenAI API this project uses.
+
+    Serves ``/v1/chat/completions``, ``/v1/files`` and ``/v1/batches`` on a background thread with
+    configurable latency and injected 429 responses. Completions carry a valid ``OpenAIResponse``
+    whose cards are derived from the request content, so identical requests get identical answers
+    and different requests get distinct cards. Batch jobs are answered the same way after
+    ``batch_duration_s``.
+
+    Example:
+        >>> with MockOpenAIServer(MockServerConfig(latency_ms=50)) as server:
+        ...     creator = StudySetCreator(api_key="benchmark", model="gpt-4o-mini", base_url=server.base_url)
+    """
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockServerConfig()
+        self.stats = MockServerStats()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self) -> MockServerStats:
+        """Return the statistics collected so far and start counting from zero."""
+        with self._lock:
+            stats, self.stats = self.stats, MockServerStats()
+        return stats
+
+    def _next_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}-mock{next(self._ids)}"
+
+    def _count(self, **increments: int):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    # Chat completions
+
+    def chat_completion(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Answer a chat completion request after the configured latency, or with a 429."""
+        config = self.config
+        with self._lock:
+            rate_limited = self._random.random() < config.rate_limit_probability
+            delay = config.latency_ms
+            if config.latency_jitter_ms:
+                delay += self._random.expovariate(1 / config.latency_jitter_ms)
+        self._count(chat_requests=1, rate_limited=int(rate_limited))
+        if rate_limited:
+            return 429, {"retry-after-ms": str(config.retry_after_ms)}, {
+                "error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}
+            }
+        time.sleep(delay / 1000)
+        return 200, {
+            "x-ratelimit-remaining-requests": "10000", "x-ratelimit-reset-requests": "1ms",
+            "x-ratelimit-remaining-tokens": "100000000", "x-ratelimit-reset-tokens": "1ms",
+        }, self._completion(body)
+
+    def _completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        parts: List[Dict[str, Any]] = []
+        for message in body.get("messages", []):
+            if message.get("role") == "user" and isinstance(message.get("content"), list):
+                parts.extend(message["content"])
+        digest = hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+        rng = random.Random(digest)
+        cards = [StudyCard(question=f"What is the role of {' '.join(rng.sample(_WORDS, 4))} in part {index}?",
+                           answer=f"It links {' '.join(rng.sample(_WORDS, 6))}.")
+                 for index in range(self.config.cards_per_part * len(parts))]
+        content = OpenAIResponse(study_cards=cards).model_dump_json()
+        prompt_tokens = len(json.dumps(body)) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{digest[:24]}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop", "logprobs": None}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    # Files
+
+    def create_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = self._next_id("file")
+        with self._lock:
+            self._files[file_id] = {"content": content, "filename": filename, "purpose": purpose,
+                                    "created_at": int(time.time())}
+        return self._file_object(file_id)
+
+    def _file_object(self, file_id: str) -> Dict[str, Any]:
+        file = self._files[file_id]
+        return {"id": file_id, "object": "file", "bytes": len(file["content"]), "created_at": file["created_at"],
+                "filename": file["filename"], "purpose": file["purpose"], "status": "processed"}
+
+    # Batches
+
+    def create_batch(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        input_file = self._files.get(body.get("input_file_id"))
+        if input_file is None:
+            return None
+        batch_id = self._next_id("batch")
+        lines = [json.loads(line) for line in input_file["content"].splitlines() if line.strip()]
+        self._count(batch_tasks=len(lines))
+        now = int(time.time())
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None, "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"), "status": "validating",
+            "output_file_id": None, "error_file_id": None, "created_at": now,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        with self._lock:
+            self._batches[batch_id] = batch
+        threading.Thread(target=self._run_batch, args=(batch_id, lines), daemon=True).start()
+        return dict(batch)
+
+    def _run_batch(self, batch_id: str, lines: List[Dict[str, Any]]):
+        with self._lock:
+            self._batches[batch_id]["status"] = "in_progress"
+        started = time.monotonic()
+        output = "".join(
+            json.dumps({"id": f"batch_req_{index}", "custom_id": task["custom_id"],
+                        "response": {"status_code": 200, "request_id": f"req_{index}",
+                                     "body": self._completion(task["body"])},
+                        "error": None}) + "\n"
+            for index, task in enumerate(lines)
+        ).encode("utf-8")
+        time.sleep(max(0.0, self.config.batch_duration_s - (time.monotonic() - started)))
+        output_file = self.create_file(output, f"{batch_id}_output.jsonl", "batch_output")
+        with self._lock:
+            batch = self._batches[batch_id]
+            batch.update(status="completed", output_file_id=output_file["id"], completed_at=int(time.time()))
+            batch["request_counts"]["completed"] = len(lines)
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return json.loads(json.dumps(batch)) if batch else None
+
+
+def _make_handler(server: MockOpenAIServer):
+    file_content = re.compile(r"^/v1/files/([^/]+)/content$")
+    batch_path = re.compile(r"^/v1/batches/([^/]+)$")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _read_body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0], 16)
+                    chunk = self.rfile.read(size + 2)[:size]
+                    if not size:
+                        break
+                    chunks.append(chunk)
+                body = b"".join(chunks)
+            else:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            server._count(bytes_uploaded=len(body))
+            return body
+
+        def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None,
+                  content_type: str = "application/json"):
+            data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self):
+            self._send(404, {"error": {"message": f"No mock route for {self.command} {self.path}",
+                                       "type": "invalid_request_error"}})
+
+        def do_POST(self):
+            body = self._read_body()
+            if self.path == "/v1/chat/completions":
+                status, headers, payload = server.chat_completion(json.loads(body))
+                self._send(status, payload, headers)
+            elif self.path == "/v1/files":
+                message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("latin-1") + body)
+                fields = {part.get_param("name", header="content-disposition"): part
+                          for part in message.iter_parts()}
+                upload = fields["file"]
+                purpose = fields["purpose"].get_payload(decode=True).decode("utf-8") if "purpose" in fields else ""
+                self._send(200, server.create_file(upload.get_payload(decode=True), upload.get_filename() or "upload",
+                                                   purpose))
+            elif self.path == "/v1/batches":
+                batch = server.create_batch(json.loads(body))
+                if batch:
+                    self._send(200, batch)
+                else:
+                    self._not_found()
+            else:
+                self._not_found()
+
+        def do_GET(self):
+            match = file_content.match(self.path)
+            if match and match.group(1) in server._files:
+                self._send(200, server._files[match.group(1)]["content"], content_type="application/octet-stream")
+                return
+            match = batch_path.match(self.path)
+            batch = server.get_batch(match.group(1)) if match else None
+            if batch:
+                self._send(200, batch)
+            else:
+                self._not_found()
+
+    return Handler
@@ -0,0 +1,300 @@
+# benchmarks/run_benchmarks.py
+
+import argparse
+import csv
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from benchmarks.mock_openai_server import MockOpenAIServer, MockServerConfig
+from benchmarks.synthetic_pdfs import PDF_KINDS, ensure_pdf
+
+STORAGE_DIR = Path(__file__).resolve().parent.parent / "storage"
+
+
+class Scenario(BaseModel):
+    """One benchmark run: a synthetic PDF processed in one API mode."""
+    kind: str
+    pages: int = Field(..., gt=0)
+    mode: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.kind}-{self.pages}-{self.mode}"
+
+
+class PipelineOptions(BaseModel):
+    """StudySetCreator settings shared by all scenarios."""
+    model: str = "gpt-4o-mini"
+    chunk_size: int = 10
+    concurrency: int = 8
+    render_workers: int = 1
+    text_only: bool = False
+
+
+class ScenarioResult(BaseModel):
+    """Measurements of one scenario."""
+    name: str
+    kind: str
+    pages: int
+    mode: str
+    seconds: float
+    cards: int
+    requests: int
+    rate_limited: int
+    pages_per_second: float
+    cards_per_second: float
+    latency_p50_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    bytes_uploaded: int
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Return the nearest-rank percentile of ``values``, rounded to one decimal, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))], 1)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _run_pipeline(scenario: Dict[str, Any], pdf_path: str, base_url: str, options: Dict[str, Any],
+                  results: "multiprocessing.Queue"):
+    """Process one PDF against the mock server in a fresh process and report the measurements."""
+    import httpx
+    from openai import OpenAI
+
+    from src.services.study_set_creator import StudySetCreator
+    from src.utils.logging import get_logger
+
+    scenario = Scenario(**scenario)
+    options = PipelineOptions(**options)
+    for handler in get_logger().handlers:
+        handler.setLevel(logging.WARNING)
+
+    latencies: List[float] = []
+    started: Dict[int, float] = {}
+    lock = threading.Lock()
+
+    def on_request(request: httpx.Request):
+        with lock:
+            started[id(request)] = time.perf_counter()
+
+    def on_response(response: httpx.Response):
+        with lock:
+            start = started.pop(id(response.request), None)
+            if start is not None and response.status_code == 200 and response.request.url.path.endswith(
+                    "/chat/completions"):
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    with tempfile.TemporaryDirectory(prefix="study_set_benchmark_") as work_dir:
+        os.chdir(work_dir)
+        output_csv = os.path.join(work_dir, "study_set.csv")
+        creator = StudySetCreator(
+            api_key="benchmark", model=options.model, output_csv=output_csv, chunk_size=options.chunk_size,
+            use_batch=scenario.mode == "batch", no_resume=True, concurrency=options.concurrency,
+            cache_dir=None, render_workers=options.render_workers, page_index_path=None, base_url=base_url
+        )
+        creator.prompt_service.prompt_file = STORAGE_DIR / "prompt.txt"
+        creator.schema_service.schema_file = STORAGE_DIR / "schema.json"
+        creator.api_service.client = OpenAI(api_key="benchmark", base_url=base_url, http_client=httpx.Client(
+            event_hooks={"request": [on_request], "response": [on_response]}))
+        if scenario.mode == "batch":
+            creator.api_service.poll_interval = 0.1
+            creator.api_service.max_poll_interval = 1.0
+
+        start = time.perf_counter()
+        creator.to_study_set(pdf_path, options.text_only)
+        seconds = time.perf_counter() - start
+
+        cards = 0
+        if os.path.exists(output_csv):
+            with open(output_csv, newline='', encoding='utf-8') as file:
+                cards = sum(1 for _ in csv.DictReader(file))
+
+    results.put({"seconds": seconds, "cards": cards, "latencies": latencies, "peak_rss_mb": _peak_rss_mb()})
+
+
+def run_scenario(scenario: Scenario, pdf_path: str, server: MockOpenAIServer,
+                 options: PipelineOptions) -> ScenarioResult:
+    """
+    Run one scenario in a separate process, so its peak memory is measured on its own.
+
+    Args:
+        scenario (Scenario): The scenario to run.
+        pdf_path (str): The synthetic PDF of the scenario.
+        server (MockOpenAIServer): The running mock server.
+        options (PipelineOptions): Pipeline settings.
+
+    Returns:
+        ScenarioResult: The measurements.
+    """
+    server.reset_stats()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_pipeline, name=f"benchmark-{scenario.name}",
+                              args=(scenario.model_dump(), pdf_path, server.base_url, options.model_dump(), results))
+    process.start()
+    while True:
+        try:
+            measured = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"Scenario {scenario.name} failed with exit code {process.exitcode}")
+    process.join()
+    stats = server.reset_stats()
+
+    seconds = measured["seconds"]
+    return ScenarioResult(
+        name=scenario.name, kind=scenario.kind, pages=scenario.pages, mode=scenario.mode,
+        seconds=round(seconds, 3), cards=measured["cards"],
+        requests=stats.batch_tasks if scenario.mode == "batch" else stats.chat_requests - stats.rate_limited,
+        rate_limited=stats.rate_limited,
+        pages_per_second=round(scenario.pages / seconds, 2), cards_per_second=round(measured["cards"] / seconds, 2),
+        latency_p50_ms=percentile(measured["latencies"], 0.5), latency_p99_ms=percentile(measured["latencies"], 0.99),
+        peak_rss_mb=measured["peak_rss_mb"], bytes_uploaded=stats.bytes_uploaded
+    )
+
+
+def format_table(results: List[ScenarioResult]) -> str:
+    """Format the results as a plain-text table."""
+    def number(value: Optional[float], digits: int = 1) -> str:
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    header = ["scenario", "seconds", "pages/s", "cards/s", "requests", "429s", "p50 ms", "p99 ms",
+              "peak RSS MB", "uploaded MB"]
+    rows = [[result.name, number(result.seconds, 2), number(result.pages_per_second), number(result.cards_per_second),
+             str(result.requests), str(result.rate_limited), number(result.latency_p50_ms),
+             number(result.latency_p99_ms), number(result.peak_rss_mb), number(result.bytes_uploaded / 1024 ** 2, 2)]
+            for result in results]
+    widths = [max(len(row[column]) for row in [header] + rows) for column in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(width) if column == 0 else cell.rjust(width)
+                               for column, (cell, width) in enumerate(zip(row, widths)))
+                     for row in [header] + rows)
+
+
+def find_regressions(results: List[ScenarioResult], baseline: List[ScenarioResult], tolerance: float) -> List[str]:
+    """
+    Compare results with a baseline report.
+
+    A scenario regressed if its throughput dropped, or its p99 latency, peak memory or uploaded
+    bytes grew, by more than ``tolerance`` (a fraction) relative to the baseline.
+
+    Returns:
+        List[str]: One description per regression.
+    """
+    previous = {result.name: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result.name)
+        if before is None:
+            continue
+        if result.pages_per_second < before.pages_per_second * (1 - tolerance):
+            regressions.append(f"{result.name}: {result.pages_per_second} pages/s, "
+                               f"baseline {before.pages_per_second}")
+        for metric in ("latency_p99_ms", "peak_rss_mb", "bytes_uploaded"):
+            value, reference = getattr(result, metric), getattr(before, metric)
+            if value is not None and reference and value > reference * (1 + tolerance):
+                regressions.append(f"{result.name}: {metric} {value}, baseline {reference}")
+    return regressions
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the study set pipeline against a local mock OpenAI server.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--kinds", nargs="+", choices=PDF_KINDS, default=list(PDF_KINDS),
+                        help="Kinds of synthetic PDFs.")
+    parser.add_argument("--pages", nargs="+", type=int, default=[10, 100], help="Page counts of the synthetic PDFs.")
+    parser.add_argument("--modes", nargs="+", choices=("direct", "batch"), default=["direct", "batch"],
+                        help="API modes to benchmark.")
+    parser.add_argument("--model", type=str, default="gpt-4o-mini", help="Model name sent to the mock server.")
+    parser.add_argument("--chunk_size", type=int, default=10, help="Maximum pages per request.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight in direct mode.")
+    parser.add_argument("--render_workers", type=int, default=1, help="Processes rendering pages.")
+    parser.add_argument("--text_only", action="store_true", help="Extract text only.")
+    parser.add_argument("--latency_ms", type=float, default=200.0, help="Minimum latency of a mock completion.")
+    parser.add_argument("--latency_jitter_ms", type=float, default=100.0,
+                        help="Mean extra latency of a mock completion (exponentially distributed).")
+    parser.add_argument("--rate_limit_probability", type=float, default=0.0,
+                        help="Probability that the mock server answers a completion with a 429.")
+    parser.add_argument("--retry_after_ms", type=int, default=200, help="Retry delay advertised with every 429.")
+    parser.add_argument("--cards_per_part", type=int, default=2,
+                        help="Cards the mock server returns per content part of a request.")
+    parser.add_argument("--batch_duration", type=float, default=1.0, help="Seconds a mock batch job takes.")
+    parser.add_argument("--work_dir", type=str, default="./.cache/benchmarks",
+                        help="Directory of the generated PDFs, which are reused across runs.")
+    parser.add_argument("--report", type=str, default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="JSON report of an earlier run; exit with status 1 if any scenario regressed.")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative change tolerated before a metric counts as a regression.")
+    args = parser.parse_args()
+    if any(pages < 1 for pages in args.pages):
+        parser.error("--pages must be positive.")
+    if not 0 <= args.rate_limit_probability < 1:
+        parser.error("--rate_limit_probability must be at least 0 and below 1.")
+    return args
+
+
+def main() -> int:
+    args = parse_arguments()
+    # Progress bars of the benchmarked runs would garble the report
+    os.environ.setdefault("TQDM_DISABLE", "1")
+    options = PipelineOptions(model=args.model, chunk_size=args.chunk_size, concurrency=args.concurrency,
+                              render_workers=args.render_workers, text_only=args.text_only)
+    config = MockServerConfig(latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                              rate_limit_probability=args.rate_limit_probability, retry_after_ms=args.retry_after_ms,
+                              cards_per_part=args.cards_per_part, batch_duration_s=args.batch_duration)
+    scenarios = [Scenario(kind=kind, pages=pages, mode=mode)
+                 for kind in args.kinds for pages in args.pages for mode in args.modes]
+
+    results = []
+    with MockOpenAIServer(config) as server:
+        for scenario in scenarios:
+            pdf_path = os.path.abspath(ensure_pdf(args.work_dir, scenario.kind, scenario.pages))
+            result = run_scenario(scenario, pdf_path, server, options)
+            print(f"{scenario.name}: {result.pages_per_second} pages/s", file=sys.stderr)
+            results.append(result)
+
+    print(format_table(results))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump({"server": config.model_dump(), "pipeline": options.model_dump(),
+                       "results": [result.model_dump() for result in results]}, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = [ScenarioResult(**result) for result in json.load(file)["results"]]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
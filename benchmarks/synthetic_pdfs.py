@@ -0,0 +1,98 @@
+# benchmarks/synthetic_pdfs.py
+
+import os
+import random
+from typing import List
+
+import fitz
+
+PDF_KINDS = ("text", "image", "mixed")
+
+_SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "sa", "vi", "nu", "pe", "dax", "qui", "zor", "lan", "fe", "mo", "ith"]
+_PAGE_RECT = fitz.paper_rect("a4")
+_MARGIN = 50
+
+
+def _words(rng: random.Random, count: int) -> List[str]:
+    return ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(count)]
+
+
+def _paragraphs(rng: random.Random, count: int, words: int) -> str:
+    return "\n\n".join(" ".join(_words(rng, words)).capitalize() + "." for _ in range(count))
+
+
+def _photo(rng: random.Random, width: int = 32, height: int = 24) -> fitz.Pixmap:
+    """A small random RGB image; scaled up on the page it renders as smooth, photo-like blobs."""
+    return fitz.Pixmap(fitz.csRGB, width, height, rng.randbytes(width * height * 3), False)
+
+
+def _add_text_page(document: fitz.Document, rng: random.Random, number: int):
+    page = document.new_page(width=_PAGE_RECT.width, height=_PAGE_RECT.height)
+    page.insert_text((_MARGIN, _MARGIN), f"Lecture {number + 1}: {' '.join(_words(rng, 4))}", fontsize=16)
+    body = fitz.Rect(_MARGIN, _MARGIN + 20, _PAGE_RECT.width - _MARGIN, _PAGE_RECT.height - _MARGIN)
+    page.insert_textbox(body, _paragraphs(rng, 10, 60), fontsize=9)
+
+
+def _add_image_page(document: fitz.Document, rng: random.Random, number: int):
+    page = document.new_page(width=_PAGE_RECT.width, height=_PAGE_RECT.height)
+    page.insert_image(page.rect, pixmap=_photo(rng))
+    page.insert_text((_MARGIN, _PAGE_RECT.height - _MARGIN), f"Slide {number + 1}", fontsize=12)
+
+
+def _add_figure_page(document: fitz.Document, rng: random.Random, number: int):
+    """A text page with a raster figure and a vector chart, as sent with cropped figures."""
+    page = document.new_page(width=_PAGE_RECT.width, height=_PAGE_RECT.height)
+    page.insert_text((_MARGIN, _MARGIN), f"Figure {number + 1}: {' '.join(_words(rng, 4))}", fontsize=16)
+    half = _PAGE_RECT.width / 2
+    page.insert_textbox(fitz.Rect(_MARGIN, _MARGIN + 20, half - 10, _PAGE_RECT.height - _MARGIN),
+                        _paragraphs(rng, 5, 40), fontsize=9)
+    page.insert_image(fitz.Rect(half + 10, _MARGIN + 20, _PAGE_RECT.width - _MARGIN, 330), pixmap=_photo(rng))
+
+    chart = fitz.Rect(half + 10, 360, _PAGE_RECT.width - _MARGIN, 560)
+    shape = page.new_shape()
+    shape.draw_rect(chart)
+    for bar in range(24):
+        x = chart.x0 + 4 + bar * (chart.width - 8) / 24
+        shape.draw_line((x, chart.y1), (x, chart.y1 - rng.uniform(10, chart.height - 10)))
+    shape.finish(color=(0, 0, 0.6), width=2)
+    shape.commit()
+
+
+def generate_pdf(path: str, kind: str, pages: int, seed: int = 0) -> str:
+    """
+    Write a synthetic lecture PDF.
+
+    Args:
+        path (str): Output path.
+        kind (str): ``text`` for dense text pages, ``image`` for full-page images with a caption, or
+            ``mixed`` for a rotation of text pages, text pages with figures and image pages.
+        pages (int): Number of pages.
+        seed (int): Seed of the generated content; the same arguments always produce the same document.
+
+    Returns:
+        str: ``path``.
+    """
+    if kind not in PDF_KINDS:
+        raise ValueError(f"Unknown PDF kind {kind!r}; expected one of {', '.join(PDF_KINDS)}")
+    rng = random.Random(f"{kind}-{pages}-{seed}")
+    builders = {
+        "text": [_add_text_page],
+        "image": [_add_image_page],
+        "mixed": [_add_text_page, _add_figure_page, _add_text_page, _add_image_page],
+    }[kind]
+    document = fitz.open()
+    for number in range(pages):
+        builders[number % len(builders)](document, rng, number)
+    document.save(path, garbage=3, deflate=True)
+    document.close()
+    return path
+
+
+def ensure_pdf(work_dir: str, kind: str, pages: int, seed: int = 0) -> str:
+    """Return the path of a synthetic PDF in ``work_dir``, generating it on first use."""
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, f"{kind}_{pages}_{seed}.pdf")
+    if not os.path.exists(path):
+        generate_pdf(f"{path}.tmp", kind, pages, seed)
+        os.replace(f"{path}.tmp", path)
+    return path
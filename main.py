@@ -6,6 +6,9 @@ from typing import Optional
 
 from pydantic import BaseModel, Field
 
+from src.models.image_encoding import ImageEncoding
+from src.services.folder_watcher import FolderWatcher
+from src.services.run_manifest import RunManifest
 from src.services.study_set_creator import StudySetCreator
 from src.utils.config import get_api_key
 from src.utils.logging import get_logger
@@ -19,12 +22,48 @@ class CLIArguments(BaseModel):
     in_dir: Optional[str] = Field(None, description="Path to the input directory containing PDF files")
     out_dir: Optional[str] = Field(None, description="Path to the output directory where CSV files will be saved")
     model: str = Field("gpt-4o-mini", description="OpenAI model to use")
+    base_url: Optional[str] = Field(None, description="OpenAI-compatible API endpoint")
     chunk_size: int = Field(10, description="Number of pages to process at once")
     use_batch: bool = Field(False, description="Use OpenAI Batch API for processing")
     text_only: bool = Field(False, description="Extract text only, ignore images")
     language: str = Field("english", description="Language for the study set")
     no_resume: bool = Field(False,
                             description="Whether to resume processing from the last checkpoint. WARNING: If set and a progress file exists, it will be overwritten.")
+    concurrency: int = Field(1, ge=1, description="Number of chunk requests to keep in flight (direct API only)")
+    file_concurrency: Optional[int] = Field(None, ge=1, description="Number of PDFs processed at once in directory mode")
+    max_retries: int = Field(6, ge=0, description="Retries for rate-limited or transiently failing API requests")
+    cache_dir: str = Field("./.cache/responses", description="Directory of the on-disk response cache")
+    no_cache: bool = Field(False, description="Disable the response cache")
+    cache_max_size_mb: float = Field(1024, description="Maximum size of the response cache in MB")
+    cache_max_age_days: float = Field(30, description="Maximum age of response cache entries in days")
+    render_workers: int = Field(1, ge=1, description="Number of processes used to render PDF pages")
+    no_wait: bool = Field(False, description="Submit batch jobs and exit instead of waiting for them to finish")
+    min_figure_coverage: float = Field(0.05, ge=0, le=1,
+                                       description="Fraction of a page an image or drawing must cover to be sent as a figure")
+    full_page_coverage: float = Field(0.5, ge=0, le=1,
+                                      description="Send the whole page as an image once its figures cover this fraction")
+    image_resolution: int = Field(500, gt=0, description="Short side of rendered page images in pixels")
+    image_format: str = Field("jpeg", description="Format of rendered page images")
+    image_quality: int = Field(95, ge=1, le=100, description="JPEG/WebP quality of rendered page images")
+    grayscale: bool = Field(False, description="Render page images in grayscale")
+    image_detail: str = Field("auto", description="OpenAI detail level of page images")
+    max_input_tokens: int = Field(16000, gt=0, description="Input token budget of a single request")
+    max_output_tokens: int = Field(4095, gt=0, description="Tokens reserved for the response of a single request")
+    context_window: int = Field(128_000, gt=0, description="Context window of the model in tokens")
+    dry_run: bool = Field(False, description="Only plan the requests and report them, without calling the API")
+    dedup: str = Field("none", description="Scope of near-duplicate card removal: none, file or run")
+    dedup_threshold: float = Field(0.8, ge=0, le=1, description="Similarity at which two cards count as duplicates")
+    page_index: str = Field("./.cache/page_index.sqlite", description="Page fingerprint index reused across runs")
+    no_page_index: bool = Field(False, description="Disable reusing cards of pages seen before")
+    no_manifest: bool = Field(False, description="Process every PDF of --in_dir, not only new or changed ones")
+    prune: bool = Field(False, description="Delete the study sets of PDFs removed from --in_dir")
+    watch: bool = Field(False, description="Keep running and process PDFs as they are added to --in_dir")
+    watch_settle: float = Field(5.0, ge=0, description="Seconds a new file must stay unchanged before it is processed")
+    watch_poll_interval: float = Field(2.0, gt=0, description="Seconds between scans when inotify is unavailable")
+    report: Optional[str] = Field(None, description="JSON file receiving the timing, token and cost report of the run")
+    metrics_file: Optional[str] = Field(None, description="File receiving the run report in the OpenMetrics text format")
+    input_price: Optional[float] = Field(None, ge=0, description="USD per million input tokens")
+    output_price: Optional[float] = Field(None, ge=0, description="USD per million output tokens")
 
 
 def parse_arguments() -> CLIArguments:
@@ -40,6 +79,9 @@ def parse_arguments() -> CLIArguments:
     parser.add_argument("--in_dir", type=str, help="Path to the input directory containing PDF files.")
     parser.add_argument("--out_dir", type=str, help="Path to the output directory where CSV files will be saved.")
     parser.add_argument("--model", type=str, default="gpt-4o-mini", help="OpenAI model to use.")
+    parser.add_argument("--base_url", type=str, default=None,
+                        help="OpenAI-compatible API endpoint, e.g. a proxy or the local benchmark server "
+                             "(default: OPENAI_BASE_URL or the OpenAI API).")
     parser.add_argument("--chunk_size", type=int, default=10, help="Number of pages to process at once.")
     parser.add_argument("--use_batch", action="store_true", help="Use OpenAI Batch API for processing.")
     parser.add_argument("--text_only", action="store_true", help="Extract text only, ignore images.")
@@ -50,6 +92,88 @@ def parse_arguments() -> CLIArguments:
         default=False,
         help="Whether to resume processing from the last checkpoint. WARNING: If set and a progress file exists, it will be overwritten."
     )
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Number of chunk requests to keep in flight (direct API only), shared by all PDFs.")
+    parser.add_argument("--file_concurrency", type=int, default=None,
+                        help="Number of PDFs processed at once with --in_dir and the direct API "
+                             "(default: --concurrency). All of them share the --concurrency request slots.")
+    parser.add_argument("--max_retries", type=int, default=6,
+                        help="Retries for rate-limited or transiently failing API requests.")
+    parser.add_argument("--cache_dir", type=str, default="./.cache/responses",
+                        help="Directory of the on-disk response cache.")
+    parser.add_argument("--no_cache", action="store_true", help="Disable the response cache.")
+    parser.add_argument("--cache_max_size_mb", type=float, default=1024,
+                        help="Maximum size of the response cache in MB.")
+    parser.add_argument("--cache_max_age_days", type=float, default=30,
+                        help="Maximum age of response cache entries in days.")
+    parser.add_argument("--render_workers", type=int, default=1,
+                        help="Number of processes used to render PDF pages.")
+    parser.add_argument("--no_wait", action="store_true",
+                        help="Submit batch jobs and exit instead of waiting for them to finish. "
+                             "Run the same command again later to collect finished jobs.")
+    parser.add_argument("--min_figure_coverage", type=float, default=0.05,
+                        help="Fraction of a page an image or drawing must cover to be sent as a figure. "
+                             "Smaller images such as logos are ignored and the page is sent as text.")
+    parser.add_argument("--full_page_coverage", type=float, default=0.5,
+                        help="Send the whole page as an image once its figures cover this fraction; "
+                             "below it, the text is sent together with the cropped figures.")
+    parser.add_argument("--image_resolution", type=int, default=500,
+                        help="Short side of rendered page images in pixels.")
+    parser.add_argument("--image_format", choices=["jpeg", "webp", "png"], default="jpeg",
+                        help="Format of rendered page images. WebP requires Pillow.")
+    parser.add_argument("--image_quality", type=int, default=95,
+                        help="JPEG/WebP quality of rendered page images (1-100).")
+    parser.add_argument("--grayscale", action="store_true", help="Render page images in grayscale.")
+    parser.add_argument("--image_detail", choices=["auto", "low", "high"], default="auto",
+                        help="OpenAI detail level of page images. 'low' costs a flat 85 tokens per image.")
+    parser.add_argument("--max_input_tokens", type=int, default=16000,
+                        help="Input token budget of a single request, including prompt and schema. Pages are "
+                             "packed into a request until this budget or --chunk_size pages is reached.")
+    parser.add_argument("--max_output_tokens", type=int, default=4095,
+                        help="Tokens reserved for the response of a single request.")
+    parser.add_argument("--context_window", type=int, default=128_000,
+                        help="Context window of the model in tokens. Requests never exceed it minus "
+                             "--max_output_tokens.")
+    parser.add_argument("--dry_run", action="store_true",
+                        help="Render and plan the requests, report how many would be sent and how many pages "
+                             "each covers, then exit without calling the API.")
+    parser.add_argument("--dedup", choices=["none", "file", "run"], default="none",
+                        help="Remove near-duplicate cards within each output file ('file') or across all outputs "
+                             "of the run ('run'), keeping the first occurrence in input order (default: none).")
+    parser.add_argument("--dedup_threshold", type=float, default=0.8,
+                        help="Estimated similarity (0-1) of question and answer at which two cards count as "
+                             "duplicates.")
+    parser.add_argument("--page_index", type=str, default="./.cache/page_index.sqlite",
+                        help="SQLite index of page fingerprints and their cards. Recycled slides found in the "
+                             "index reuse their cards instead of being sent to the model again.")
+    parser.add_argument("--no_page_index", action="store_true", help="Disable the page fingerprint index.")
+    parser.add_argument("--no_manifest", action="store_true",
+                        help="With --in_dir, process every PDF instead of only those that are new or changed "
+                             "since the last run, and do not keep a manifest in --out_dir.")
+    parser.add_argument("--prune", action="store_true",
+                        help="With --in_dir, delete the study sets of PDFs recorded in the manifest that were "
+                             "removed from --in_dir. Without it, removed PDFs are only reported. Nothing is "
+                             "deleted when --in_dir holds no PDFs at all.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and process PDFs as they are added to or changed in --in_dir, "
+                             "until interrupted with Ctrl+C (direct API only).")
+    parser.add_argument("--watch_settle", type=float, default=5.0,
+                        help="Seconds a file's size and modification time must stay unchanged before it is "
+                             "processed, so files still being uploaded are not picked up half-written.")
+    parser.add_argument("--watch_poll_interval", type=float, default=2.0,
+                        help="Seconds between directory scans with --watch where inotify is unavailable.")
+    parser.add_argument("--report", type=str, default=None,
+                        help="Write a JSON report of the run to this file: time spent rendering, preparing, "
+                             "requesting, parsing and writing, tokens per page, cost per PDF and throughput.")
+    parser.add_argument("--metrics_file", type=str, default=None,
+                        help="Write the run report to this file in the Prometheus/OpenMetrics text format, "
+                             "e.g. for the node exporter's textfile collector.")
+    parser.add_argument("--input_price", type=float, default=None,
+                        help="Price in USD per million input tokens used for cost estimates "
+                             "(default: the list price of known models).")
+    parser.add_argument("--output_price", type=float, default=None,
+                        help="Price in USD per million output tokens used for cost estimates "
+                             "(default: the list price of known models).")
 
     args = parser.parse_args()
 
@@ -66,6 +190,60 @@ def parse_arguments() -> CLIArguments:
     if not ((args.input and args.output) or (args.in_dir and args.out_dir)):
         parser.error("You must provide either both --input and --output, or both --in_dir and --out_dir.")
 
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1.")
+
+    if args.file_concurrency is not None and args.file_concurrency < 1:
+        parser.error("--file_concurrency must be at least 1.")
+
+    if args.max_retries < 0:
+        parser.error("--max_retries must not be negative.")
+
+    if args.no_wait and not args.use_batch:
+        parser.error("--no_wait can only be used together with --use_batch.")
+
+    if args.watch and not args.in_dir:
+        parser.error("--watch requires --in_dir and --out_dir.")
+
+    if args.watch and (args.use_batch or args.dry_run):
+        parser.error("--watch cannot be combined with --use_batch or --dry_run.")
+
+    if args.watch_settle < 0:
+        parser.error("--watch_settle must not be negative.")
+
+    if args.watch_poll_interval <= 0:
+        parser.error("--watch_poll_interval must be positive.")
+
+    for name in ("input_price", "output_price"):
+        if getattr(args, name) is not None and getattr(args, name) < 0:
+            parser.error(f"--{name} must not be negative.")
+
+    if args.render_workers < 1:
+        parser.error("--render_workers must be at least 1.")
+
+    for name in ("min_figure_coverage", "full_page_coverage", "dedup_threshold"):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error(f"--{name} must be between 0 and 1.")
+
+    if args.image_resolution < 1:
+        parser.error("--image_resolution must be at least 1.")
+
+    for name in ("max_input_tokens", "max_output_tokens", "context_window"):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name} must be at least 1.")
+
+    if args.max_output_tokens >= args.context_window:
+        parser.error("--max_output_tokens must be smaller than --context_window.")
+
+    if not 1 <= args.image_quality <= 100:
+        parser.error("--image_quality must be between 1 and 100.")
+
+    if args.image_format == "webp":
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            parser.error("--image_format webp requires Pillow (pip install Pillow).")
+
     return CLIArguments(**vars(args))
 
 
@@ -77,6 +255,13 @@ def main() -> None:
     and generates the study set based on the provided PDF file(s) and options.
     """
     args = parse_arguments()
+    image_encoding = ImageEncoding(
+        resolution=args.image_resolution,
+        format=args.image_format,
+        quality=args.image_quality,
+        grayscale=args.grayscale,
+        detail=args.image_detail
+    )
 
     api_key = get_api_key()
     if not api_key:
@@ -88,18 +273,44 @@ def main() -> None:
         creator = StudySetCreator(
             api_key=api_key,
             model=args.model,
+            base_url=args.base_url,
             output_csv=args.output,
             chunk_size=args.chunk_size,
             use_batch=args.use_batch,
             language=args.language,
-            no_resume=args.no_resume
+            no_resume=args.no_resume,
+            concurrency=args.concurrency,
+            file_concurrency=args.file_concurrency,
+            max_retries=args.max_retries,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            cache_max_size_mb=args.cache_max_size_mb,
+            cache_max_age_days=args.cache_max_age_days,
+            render_workers=args.render_workers,
+            wait_for_batch=not args.no_wait,
+            min_figure_coverage=args.min_figure_coverage,
+            full_page_coverage=args.full_page_coverage,
+            image_encoding=image_encoding,
+            max_input_tokens=args.max_input_tokens,
+            max_output_tokens=args.max_output_tokens,
+            context_window=args.context_window,
+            dedup=args.dedup,
+            dedup_threshold=args.dedup_threshold,
+            page_index_path=None if args.no_page_index else args.page_index,
+            report_path=args.report,
+            metrics_path=args.metrics_file,
+            input_price=args.input_price,
+            output_price=args.output_price
         )
-        creator.to_study_set(args.input, args.text_only)
+        if args.dry_run:
+            creator.plan_study_sets([args.input], args.text_only)
+        else:
+            creator.to_study_set(args.input, args.text_only)
     elif args.in_dir:
         # Multiple files processing
         os.makedirs(args.out_dir, exist_ok=True)
+        manifest_path = None if args.no_manifest else os.path.join(args.out_dir, RunManifest.FILE_NAME)
         pdf_files = [f for f in os.listdir(args.in_dir) if f.lower().endswith('.pdf')]
-        if not pdf_files:
+        if not pdf_files and not args.watch:
             logger.error(f"No PDF files found in directory {args.in_dir}")
             return
 
@@ -109,17 +320,49 @@ def main() -> None:
         creator = StudySetCreator(
             api_key=api_key,
             model=args.model,
+            base_url=args.base_url,
             chunk_size=args.chunk_size,
             use_batch=args.use_batch,
             language=args.language,
-            no_resume=args.no_resume
+            no_resume=args.no_resume,
+            concurrency=args.concurrency,
+            file_concurrency=args.file_concurrency,
+            max_retries=args.max_retries,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            cache_max_size_mb=args.cache_max_size_mb,
+            cache_max_age_days=args.cache_max_age_days,
+            render_workers=args.render_workers,
+            wait_for_batch=not args.no_wait,
+            min_figure_coverage=args.min_figure_coverage,
+            full_page_coverage=args.full_page_coverage,
+            image_encoding=image_encoding,
+            max_input_tokens=args.max_input_tokens,
+            max_output_tokens=args.max_output_tokens,
+            context_window=args.context_window,
+            dedup=args.dedup,
+            dedup_threshold=args.dedup_threshold,
+            page_index_path=None if args.no_page_index else args.page_index,
+            manifest_path=manifest_path,
+            prune=args.prune,
+            report_path=args.report,
+            metrics_path=args.metrics_file,
+            input_price=args.input_price,
+            output_price=args.output_price
         )
 
-        creator.process_multiple_pdfs(
-            pdf_paths=pdf_paths,
-            output_paths=output_paths,
-            text_only=args.text_only
-        )
+        if args.watch:
+            watcher = FolderWatcher(args.in_dir, settle_seconds=args.watch_settle,
+                                    poll_interval=args.watch_poll_interval)
+            creator.watch_directory(args.in_dir, args.out_dir, args.text_only, watcher)
+        elif args.dry_run:
+            creator.plan_study_sets(pdf_paths, args.text_only, output_paths, args.in_dir)
+        else:
+            creator.process_multiple_pdfs(
+                pdf_paths=pdf_paths,
+                output_paths=output_paths,
+                text_only=args.text_only,
+                input_dir=args.in_dir
+            )
     else:
         # Should not reach here
         logger.error("Invalid arguments provided.")
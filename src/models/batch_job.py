@@ -15,7 +15,7 @@ class BatchJob(BaseModel):
         output_file_id (str): Identifier for the output file of the batch job.
 
     Example:
-        >>> job = BatchJob(id="job123", status="running", output_file_id="file456")
+        >>> job = BatchJob(id="job123", status="in_progress", output_file_id="file456")
     """
     id: str = Field(..., description="Unique identifier for the batch job")
     status: str = Field(..., description="Current status of the batch job")
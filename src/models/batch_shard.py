@@ -0,0 +1,22 @@
+# src/models/batch_shard.py
+
+from typing import List
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class BatchShard(BaseModel):
+    """
+    Represents one submitted batch job holding a slice of a larger set of batch tasks.
+
+    Attributes:
+        job_id (str): Identifier of the batch job.
+        custom_ids (List[str]): Custom identifiers of the tasks submitted in the job.
+
+    Example:
+        >>> shard = BatchShard(job_id="batch_abc123", custom_ids=["lecture_pages_0-9"])
+    """
+    job_id: str = Field(..., min_length=1, description="Identifier of the batch job")
+    custom_ids: List[str] = Field(default_factory=list, description="Custom identifiers of the tasks in the job")
+
+    model_config = ConfigDict(frozen=True)
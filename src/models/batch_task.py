@@ -0,0 +1,24 @@
+# src/models/batch_task.py
+
+from typing import List
+
+from pydantic import BaseModel, Field, ConfigDict
+
+from src.models.page_content import PageContent
+
+
+class BatchTask(BaseModel):
+    """
+    Represents one request of a batch job, covering one or more consecutive pages of a PDF.
+
+    Attributes:
+        custom_id (str): Identifier of the task, unique within a batch job.
+        pages (List[PageContent]): Pages sent together in the task.
+
+    Example:
+        >>> task = BatchTask(custom_id="lecture_pages_0-9", pages=pages)
+    """
+    custom_id: str = Field(..., min_length=1, description="Identifier of the task, unique within a batch job")
+    pages: List[PageContent] = Field(..., min_length=1, description="Pages sent together in the task")
+
+    model_config = ConfigDict(frozen=True)
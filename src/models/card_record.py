@@ -0,0 +1,21 @@
+# src/models/card_record.py
+
+from typing import NamedTuple
+
+
+class CardRecord(NamedTuple):
+    """
+    Compact internal form of a study card, used once the card was validated at the API boundary.
+
+    Journals, caches, deduplication and CSV output handle cards in bulk, so they use this tuple
+    instead of a ``StudyCard`` model; ``StudyCard`` and ``OpenAIResponse`` remain the public API.
+
+    Attributes:
+        question (str): The question presented on the study card.
+        answer (str): The answer corresponding to the question on the study card.
+
+    Example:
+        >>> card = CardRecord("What is the capital of France?", "Paris")
+    """
+    question: str
+    answer: str
@@ -0,0 +1,39 @@
+# src/models/document_report.py
+
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class DocumentReport(BaseModel):
+    """
+    Work, tokens and cost attributed to one PDF of a run.
+
+    Attributes:
+        pdf (str): Path of the PDF.
+        pages (int): Pages rendered or extracted.
+        images (int): Page images sent.
+        requests (int): Successful API requests or batch tasks.
+        retries (int): Requests that were retried.
+        prompt_tokens (int): Input tokens reported by the API.
+        completion_tokens (int): Output tokens reported by the API.
+        cards (int): Study cards written.
+        seconds (float): Wall time from the first to the last work on the PDF.
+        tokens_per_page (Optional[float]): Prompt and completion tokens per page.
+        cost_usd (Optional[float]): Estimated cost, if the model's prices are known.
+
+    Example:
+        >>> document = DocumentReport(pdf="lecture.pdf", pages=10, requests=1, prompt_tokens=4000,
+        ...                           completion_tokens=800, cards=25, seconds=3.2)
+    """
+    pdf: str = Field(..., description="Path of the PDF")
+    pages: int = Field(default=0, ge=0, description="Pages rendered or extracted")
+    images: int = Field(default=0, ge=0, description="Page images sent")
+    requests: int = Field(default=0, ge=0, description="Successful API requests or batch tasks")
+    retries: int = Field(default=0, ge=0, description="Requests that were retried")
+    prompt_tokens: int = Field(default=0, ge=0, description="Input tokens reported by the API")
+    completion_tokens: int = Field(default=0, ge=0, description="Output tokens reported by the API")
+    cards: int = Field(default=0, ge=0, description="Study cards written")
+    seconds: float = Field(default=0.0, ge=0, description="Wall time spent on the PDF")
+    tokens_per_page: Optional[float] = Field(default=None, description="Tokens per page")
+    cost_usd: Optional[float] = Field(default=None, description="Estimated cost in USD")
@@ -0,0 +1,33 @@
+# src/models/image_encoding.py
+
+from typing import Literal
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class ImageEncoding(BaseModel):
+    """
+    Controls how page images are rendered, encoded and sent to the model.
+
+    Attributes:
+        resolution (int): Length of the short side of a full-page render in pixels.
+        format (str): Image format, one of "jpeg", "webp" or "png". WebP requires Pillow.
+        quality (int): Lossy compression quality for JPEG and WebP.
+        grayscale (bool): Render pages in grayscale instead of color.
+        detail (str): OpenAI image detail level, one of "auto", "low" or "high".
+
+    Example:
+        >>> encoding = ImageEncoding(resolution=768, format="webp", quality=80, detail="high")
+    """
+    resolution: int = Field(default=500, gt=0, description="Short side of a full-page render in pixels")
+    format: Literal["jpeg", "webp", "png"] = Field(default="jpeg", description="Image format")
+    quality: int = Field(default=95, ge=1, le=100, description="JPEG/WebP quality")
+    grayscale: bool = Field(default=False, description="Render in grayscale")
+    detail: Literal["auto", "low", "high"] = Field(default="auto", description="OpenAI image detail level")
+
+    model_config = ConfigDict(frozen=True)
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type of the encoded images."""
+        return f"image/{self.format}"
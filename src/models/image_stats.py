@@ -0,0 +1,27 @@
+# src/models/image_stats.py
+
+from pydantic import BaseModel, Field
+
+from src.models.page_content import PageContent
+from src.utils.tokens import estimate_image_tokens
+
+
+class ImageStats(BaseModel):
+    """
+    Running totals of the page images produced during a run.
+
+    Attributes:
+        images (int): Number of images rendered.
+        bytes (int): Total size of the encoded images.
+        tokens (int): Estimated input tokens of the images.
+    """
+    images: int = Field(default=0, ge=0, description="Number of images rendered")
+    bytes: int = Field(default=0, ge=0, description="Total size of the encoded images")
+    tokens: int = Field(default=0, ge=0, description="Estimated input tokens of the images")
+
+    def add(self, page: PageContent):
+        """Account for the image of ``page``, if it has one."""
+        if page.image_data:
+            self.images += 1
+            self.bytes += len(page.image_data)
+            self.tokens += estimate_image_tokens(page.image_width, page.image_height, page.image_detail)
@@ -2,7 +2,16 @@ from enum import Enum
 
 
 class JobStatus(str, Enum):
-    PENDING = "pending"
-    RUNNING = "running"
+    VALIDATING = "validating"
+    IN_PROGRESS = "in_progress"
+    FINALIZING = "finalizing"
     COMPLETED = "completed"
-    FAILED = "failed"
\ No newline at end of file
+    FAILED = "failed"
+    EXPIRED = "expired"
+    CANCELLING = "cancelling"
+    CANCELLED = "cancelled"
+
+    @classmethod
+    def terminal(cls) -> frozenset:
+        """Statuses after which a batch job never changes again."""
+        return frozenset({cls.COMPLETED, cls.FAILED, cls.EXPIRED, cls.CANCELLED})
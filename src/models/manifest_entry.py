@@ -0,0 +1,52 @@
+# src/models/manifest_entry.py
+
+from typing import Optional
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class ManifestEntry(BaseModel):
+    """
+    Records one input PDF of a directory run and the settings its study set was generated with.
+
+    Attributes:
+        source (str): File name of the PDF inside the input directory.
+        input_dir (Optional[str]): Absolute path of the input directory; None in manifests written before
+            it was recorded.
+        output (str): Path of the study set generated for it.
+        size (int): Size of the PDF in bytes.
+        mtime_ns (int): Modification time of the PDF in nanoseconds.
+        sha256 (str): SHA-256 digest of the PDF's content.
+        model (str): Model the study set was generated with.
+        language (str): Language of the study set.
+        text_only (bool): Whether only the text of the PDF was used.
+        prompt_sha256 (str): SHA-256 digest of the system prompt.
+        schema_sha256 (str): SHA-256 digest of the response schema.
+
+    Example:
+        >>> entry = ManifestEntry(source="lecture.pdf", input_dir="/data/week1", output="out/lecture.csv",
+        ...                       size=1024, mtime_ns=0,
+        ...                       sha256="ab12...", model="gpt-4o-mini", language="english", text_only=False,
+        ...                       prompt_sha256="cd34...", schema_sha256="ef56...")
+    """
+    source: str = Field(..., min_length=1, description="File name of the PDF")
+    input_dir: Optional[str] = Field(None, description="Absolute path of the input directory")
+    output: str = Field(..., min_length=1, description="Path of the generated study set")
+    size: int = Field(..., ge=0, description="Size of the PDF in bytes")
+    mtime_ns: int = Field(..., description="Modification time of the PDF in nanoseconds")
+    sha256: str = Field(..., description="Digest of the PDF's content")
+    model: str = Field(..., description="Model used")
+    language: str = Field(..., description="Language of the study set")
+    text_only: bool = Field(..., description="Whether only the text was used")
+    prompt_sha256: str = Field(..., description="Digest of the system prompt")
+    schema_sha256: str = Field(..., description="Digest of the response schema")
+
+    model_config = ConfigDict(frozen=True)
+
+    def matches(self, other: "ManifestEntry") -> bool:
+        """
+        Whether both entries describe the same content, output and settings; the modification time may
+        differ, and so may the input directory of an entry that does not record one.
+        """
+        exclude = {"mtime_ns"} if self.input_dir and other.input_dir else {"mtime_ns", "input_dir"}
+        return self.model_dump(exclude=exclude) == other.model_dump(exclude=exclude)
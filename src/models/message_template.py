@@ -0,0 +1,39 @@
+# src/models/message_template.py
+
+from typing import Any, Dict
+
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class MessageTemplate(BaseModel):
+    """
+    The static part of every request for one language, built once from the prompt and schema files.
+
+    The system message and response format are shared by every request and must not be modified.
+    Requests put the system message first and the page content last, so their prefix is byte-identical
+    and OpenAI's prompt caching applies to it.
+
+    Attributes:
+        language (str): Language of the study set.
+        system_prompt (str): System prompt with the language filled in.
+        json_schema (Dict[str, Any]): Response format sent with every request.
+        system_message (Dict[str, Any]): System message sent first in every request.
+        prompt_sha256 (str): SHA-256 digest of the system prompt.
+        schema_sha256 (str): SHA-256 digest of the response format in canonical JSON.
+        sha256 (str): SHA-256 digest of the language, prompt and schema together.
+
+    Example:
+        >>> template = MessageTemplate(language="english", system_prompt="Create study cards.",
+        ...                            json_schema={"type": "json_schema"},
+        ...                            system_message={"role": "system", "content": "Create study cards."},
+        ...                            prompt_sha256="ab12...", schema_sha256="cd34...", sha256="ef56...")
+    """
+    model_config = ConfigDict(frozen=True)
+
+    language: str = Field(..., description="Language of the study set")
+    system_prompt: str = Field(..., description="System prompt with the language filled in")
+    json_schema: Dict[str, Any] = Field(..., description="Response format sent with every request")
+    system_message: Dict[str, Any] = Field(..., description="System message sent first in every request")
+    prompt_sha256: str = Field(..., description="SHA-256 digest of the system prompt")
+    schema_sha256: str = Field(..., description="SHA-256 digest of the response format")
+    sha256: str = Field(..., description="SHA-256 digest of language, prompt and schema")
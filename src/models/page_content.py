@@ -10,5 +10,10 @@ class PageContent(BaseModel):
     page_number: int = Field(..., ge=0, description="Page number")
     image_data: Optional[bytes] = Field(default=None, description="Binary image data")
     text: Optional[str] = Field(default=None, description="Text content of the page")
+    image_width: Optional[int] = Field(default=None, ge=0, description="Width of the rendered image in pixels")
+    image_height: Optional[int] = Field(default=None, ge=0, description="Height of the rendered image in pixels")
+    image_mime_type: Optional[str] = Field(default=None, description="MIME type of the image data")
+    image_detail: Optional[str] = Field(default=None, description="OpenAI image detail level")
+    fingerprint: Optional[str] = Field(default=None, description="Content fingerprint used by the page index")
 
     model_config = ConfigDict(frozen=True)
@@ -0,0 +1,10 @@
+# src/models/page_kind.py
+
+from enum import Enum
+
+
+class PageKind(str, Enum):
+    """How a PDF page is sent to the model."""
+    TEXT = "text"
+    IMAGE = "image"
+    TEXT_WITH_FIGURES = "text_with_figures"
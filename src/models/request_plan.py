@@ -0,0 +1,50 @@
+# src/models/request_plan.py
+
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+
+class RequestPlan(BaseModel):
+    """
+    Summary of how pages are mapped to API requests.
+
+    Attributes:
+        requests (int): Number of planned requests.
+        pages (int): Number of pages covered by the requests.
+        estimated_input_tokens (int): Estimated input tokens of all requests, including prompt and schema.
+        pages_per_request (Dict[int, int]): Number of requests for each request size in pages.
+
+    Example:
+        >>> plan = RequestPlan()
+        >>> plan.add(pages=10, estimated_input_tokens=4200)
+    """
+    requests: int = Field(default=0, ge=0, description="Number of planned requests")
+    pages: int = Field(default=0, ge=0, description="Number of pages covered by the requests")
+    estimated_input_tokens: int = Field(default=0, ge=0, description="Estimated input tokens of all requests")
+    pages_per_request: Dict[int, int] = Field(default_factory=dict,
+                                              description="Number of requests for each request size in pages")
+
+    def add(self, pages: int, estimated_input_tokens: int):
+        """Record one planned request."""
+        self.requests += 1
+        self.pages += pages
+        self.estimated_input_tokens += estimated_input_tokens
+        self.pages_per_request[pages] = self.pages_per_request.get(pages, 0) + 1
+
+    def merge(self, other: "RequestPlan"):
+        """Add the requests of another plan to this one."""
+        self.requests += other.requests
+        self.pages += other.pages
+        self.estimated_input_tokens += other.estimated_input_tokens
+        for pages, count in other.pages_per_request.items():
+            self.pages_per_request[pages] = self.pages_per_request.get(pages, 0) + count
+
+    def describe(self) -> str:
+        """Human-readable one-line summary of the plan."""
+        if not self.requests:
+            return "0 requests"
+        sizes = ", ".join(f"{count}x{pages}" for pages, count in sorted(self.pages_per_request.items(), reverse=True))
+        return (f"{self.requests} requests covering {self.pages} pages "
+                f"(~{self.pages / self.requests:.1f} pages and ~{self.estimated_input_tokens // self.requests} "
+                f"input tokens per request; requests x pages: {sizes})")
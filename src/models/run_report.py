@@ -0,0 +1,48 @@
+# src/models/run_report.py
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.models.document_report import DocumentReport
+from src.models.stage_report import StageReport
+
+
+class RunReport(BaseModel):
+    """
+    Machine-readable summary of where a run spent its time, tokens and money.
+
+    Attributes:
+        started_at (str): Start of the run as an ISO 8601 timestamp.
+        seconds (float): Wall time of the run so far.
+        model (Optional[str]): Model used.
+        pages (int): Pages rendered or extracted.
+        pages_per_second (float): Pages per second of wall time.
+        cards (int): Study cards written.
+        cards_per_second (float): Cards per second of wall time.
+        requests (int): Successful API requests or batch tasks.
+        retries (int): Requests that were retried.
+        rate_limited (int): Retries caused by rate limiting.
+        prompt_tokens (int): Input tokens reported by the API.
+        completion_tokens (int): Output tokens reported by the API.
+        base64_bytes (int): Base64-encoded image data sent.
+        cost_usd (Optional[float]): Estimated cost, if the model's prices are known.
+        stages (Dict[str, StageReport]): Timing of the render, prepare, request, parse and write stages.
+        documents (List[DocumentReport]): Work, tokens and cost of each PDF.
+    """
+    started_at: str = Field(..., description="Start of the run")
+    seconds: float = Field(default=0.0, ge=0, description="Wall time of the run")
+    model: Optional[str] = Field(default=None, description="Model used")
+    pages: int = Field(default=0, ge=0, description="Pages rendered or extracted")
+    pages_per_second: float = Field(default=0.0, ge=0, description="Pages per second")
+    cards: int = Field(default=0, ge=0, description="Study cards written")
+    cards_per_second: float = Field(default=0.0, ge=0, description="Cards per second")
+    requests: int = Field(default=0, ge=0, description="Successful API requests or batch tasks")
+    retries: int = Field(default=0, ge=0, description="Requests that were retried")
+    rate_limited: int = Field(default=0, ge=0, description="Retries caused by rate limiting")
+    prompt_tokens: int = Field(default=0, ge=0, description="Input tokens reported by the API")
+    completion_tokens: int = Field(default=0, ge=0, description="Output tokens reported by the API")
+    base64_bytes: int = Field(default=0, ge=0, description="Base64-encoded image data sent")
+    cost_usd: Optional[float] = Field(default=None, description="Estimated cost in USD")
+    stages: Dict[str, StageReport] = Field(default_factory=dict, description="Timing of each stage")
+    documents: List[DocumentReport] = Field(default_factory=list, description="Report of each PDF")
@@ -0,0 +1,28 @@
+# src/models/stage_report.py
+
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class StageReport(BaseModel):
+    """
+    Timing of one pipeline stage over a run.
+
+    Attributes:
+        count (int): Number of timed operations, e.g. pages rendered or requests sent.
+        total_seconds (float): Time spent in the stage, summed over all operations and threads.
+        mean_ms (Optional[float]): Mean duration of an operation.
+        p50_ms (Optional[float]): Median duration of an operation.
+        p99_ms (Optional[float]): 99th percentile duration of an operation.
+        max_ms (Optional[float]): Longest operation.
+
+    Example:
+        >>> stage = StageReport(count=2, total_seconds=0.5, mean_ms=250.0, p50_ms=200.0, p99_ms=300.0, max_ms=300.0)
+    """
+    count: int = Field(default=0, ge=0, description="Number of timed operations")
+    total_seconds: float = Field(default=0.0, ge=0, description="Time spent in the stage")
+    mean_ms: Optional[float] = Field(default=None, description="Mean duration of an operation")
+    p50_ms: Optional[float] = Field(default=None, description="Median duration of an operation")
+    p99_ms: Optional[float] = Field(default=None, description="99th percentile duration of an operation")
+    max_ms: Optional[float] = Field(default=None, description="Longest operation")
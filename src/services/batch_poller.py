@@ -0,0 +1,78 @@
+# src/services/batch_poller.py
+
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import openai
+
+from src.models.job_status import JobStatus
+from src.utils.logging import get_logger
+
+
+class _PollState:
+    """Polling schedule of a single batch job."""
+
+    def __init__(self, interval: float):
+        self.status: Optional[str] = None
+        self.interval = interval
+        self.next_check = 0.0
+
+
+class BatchPoller:
+    """
+    Monitors any number of batch jobs from a single loop.
+
+    Each job is checked on its own adaptive schedule: the interval starts short, grows while the
+    status stays the same and snaps back whenever the status changes. Jobs are handed back as soon
+    as they reach a terminal status (completed, failed, expired or cancelled), so a dead job can
+    never keep the loop spinning.
+    """
+
+    def __init__(self, client: Any, initial_interval: float = 5.0, max_interval: float = 300.0,
+                 backoff: float = 1.5):
+        self.client = client
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.logger = get_logger()
+
+    def poll(self, job_ids: Iterable[str], wait: bool = True) -> Iterator[Any]:
+        """
+        Yield batch jobs as they reach a terminal status.
+
+        Args:
+            job_ids (Iterable[str]): Identifiers of the batch jobs to monitor.
+            wait (bool): If False, check every job once and return, leaving unfinished jobs for a later call.
+
+        Yields:
+            Batch: The retrieved batch object of each finished job, in completion order.
+        """
+        states: Dict[str, _PollState] = {job_id: _PollState(self.initial_interval) for job_id in job_ids}
+
+        while states:
+            for job_id, state in list(states.items()):
+                if state.next_check > time.monotonic():
+                    continue
+                try:
+                    batch_job = self.client.batches.retrieve(job_id)
+                except openai.APIError as e:
+                    self.logger.warning(f"Could not check batch job {job_id}: {e}")
+                    state.next_check = time.monotonic() + state.interval
+                    continue
+
+                if batch_job.status in JobStatus.terminal():
+                    del states[job_id]
+                    yield batch_job
+                    continue
+
+                if batch_job.status != state.status:
+                    self.logger.info(f"Batch job {job_id} status: {batch_job.status}")
+                    state.status = batch_job.status
+                    state.interval = self.initial_interval
+                else:
+                    state.interval = min(self.max_interval, state.interval * self.backoff)
+                state.next_check = time.monotonic() + state.interval
+
+            if not wait or not states:
+                return
+            time.sleep(max(0.0, min(state.next_check for state in states.values()) - time.monotonic()))
@@ -0,0 +1,151 @@
+# src/services/card_deduplicator.py
+
+import hashlib
+import random
+import re
+import unicodedata
+from array import array
+from typing import Dict, Iterable, Iterator, List, Set, Union
+
+from src.models.card_record import CardRecord
+from src.utils.logging import get_logger
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_HASH_MASK = (1 << 64) - 1
+# Largest prime below 2**64, the modulus of the shingle hash
+_HASH_PRIME = (1 << 64) - 59
+# Bin values keep the top 56 hash bits; densified bins are offset above that range so they never
+# collide with a real minimum
+_VALUE_BITS = 56
+_EMPTY_BIN = _HASH_MASK
+
+
+def normalize_card_text(text: str) -> str:
+    """Normalize card text for comparison: Unicode-fold, lowercase and reduce punctuation to single spaces."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+class CardDeduplicator:
+    """
+    Drops study cards that are exact or near duplicates of a card seen before.
+
+    Each card's normalized question and answer are cut into character shingles and summarized by
+    a MinHash signature, computed with one-permutation hashing so that each shingle is hashed
+    only once. Locality-sensitive hashing splits the signature into bands, so only cards
+    sharing at least one band are compared, which keeps the cost linear in the number of cards
+    instead of comparing every pair. Two cards are duplicates when their signatures estimate a
+    Jaccard similarity of at least ``threshold``; exact duplicates are caught by a plain hash first.
+
+    The index persists across calls, so one instance deduplicates every output of a run.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 32, bands: int = 8, shingle_size: int = 5,
+                 seed: int = 1):
+        """
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity for two cards to count as duplicates.
+            num_perm (int): Number of MinHash values per card.
+            bands (int): Number of LSH bands; must divide ``num_perm``.
+            shingle_size (int): Length of the character shingles.
+            seed (int): Seed of the shingle hash; the same seed gives the same result in every process.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        if not 0 < num_perm <= 1 << (64 - _VALUE_BITS):
+            raise ValueError(f"num_perm must be between 1 and {1 << (64 - _VALUE_BITS)}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Python's hash() of a str is salted per process, so shingles are hashed with a seeded
+        # universal hash ((a * x + b) mod p) of their UTF-32 code points, which is the same in every process
+        rng = random.Random(seed)
+        self._hash_a = rng.randrange(1, _HASH_PRIME)
+        self._hash_b = rng.randrange(_HASH_PRIME)
+        self._exact: Set[bytes] = set()
+        # Signatures of kept cards, flattened, and the kept cards indexed by each of their band keys
+        self._signatures = array('Q')
+        self._buckets: Dict[int, Union[int, List[int]]] = {}
+        self.seen = 0
+        self.dropped = 0
+        self.logger = get_logger()
+
+    def filter(self, study_cards: Iterable[CardRecord]) -> Iterator[CardRecord]:
+        """
+        Yield the cards that are not duplicates of an earlier card, in their original order.
+
+        Args:
+            study_cards (Iterable[CardRecord]): Cards to filter; may be a lazily produced stream.
+
+        Yields:
+            CardRecord: Every card that was not recognized as a duplicate.
+        """
+        for card in study_cards:
+            self.seen += 1
+            if self.is_duplicate(card):
+                self.dropped += 1
+                continue
+            yield card
+
+    def is_duplicate(self, card: CardRecord) -> bool:
+        """Check ``card`` against the index and add it to the index if it is new."""
+        text = f"{normalize_card_text(card.question)} | {normalize_card_text(card.answer)}"
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        if digest in self._exact:
+            return True
+
+        signature = self._signature(text)
+        band_keys = [hash((band, *signature[band * self.rows:(band + 1) * self.rows]))
+                     for band in range(self.bands)]
+        candidates = set()
+        for key in band_keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                candidates.update(bucket if isinstance(bucket, list) else (bucket,))
+        if any(self._similarity(signature, candidate) >= self.threshold for candidate in candidates):
+            return True
+
+        self._exact.add(digest)
+        index = len(self._signatures) // self.num_perm
+        self._signatures.extend(signature)
+        for key in band_keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = index
+            elif isinstance(bucket, list):
+                bucket.append(index)
+            else:
+                self._buckets[key] = [bucket, index]
+        return False
+
+    def _signature(self, text: str) -> List[int]:
+        # A shingle of fixed-width code points maps one-to-one to an integer
+        encoded = text.encode("utf-32-le")
+        size = 4 * self.shingle_size
+        shingles = {int.from_bytes(encoded[i:i + size], "little")
+                    for i in range(0, max(1, len(encoded) - size + 4), 4)}
+
+        # One-permutation hashing: every shingle lands in one bin, which keeps its smallest hash
+        signature = [_EMPTY_BIN] * self.num_perm
+        for shingle in shingles:
+            value = (self._hash_a * shingle + self._hash_b) % _HASH_PRIME
+            bin_index, value = value % self.num_perm, value >> (64 - _VALUE_BITS)
+            if value < signature[bin_index]:
+                signature[bin_index] = value
+
+        # Fill empty bins from the next non-empty bin so short texts still yield comparable signatures
+        for bin_index in range(self.num_perm):
+            if signature[bin_index] == _EMPTY_BIN:
+                for distance in range(1, self.num_perm):
+                    value = signature[(bin_index + distance) % self.num_perm]
+                    if value < 1 << _VALUE_BITS:
+                        signature[bin_index] = value + (distance << _VALUE_BITS)
+                        break
+        return signature
+
+    def _similarity(self, signature: List[int], index: int) -> float:
+        offset = index * self.num_perm
+        matches = sum(1 for i, value in enumerate(signature) if self._signatures[offset + i] == value)
+        return matches / self.num_perm
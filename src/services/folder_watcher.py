@@ -0,0 +1,179 @@
+# src/services/folder_watcher.py
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils.logging import get_logger
+
+# inotify events that can make a file appear, change or disappear (see inotify(7))
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_WATCH_MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+# Longest wait before the watcher checks whether it was stopped
+_MAX_WAIT = 1.0
+
+
+class _Inotify:
+    """Minimal inotify binding for one directory; events only wake the watcher up to rescan."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for events and discard them; return whether any arrived."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Watches a directory for PDFs that appear, change or disappear.
+
+    On Linux the directory is watched with inotify, so the watcher sleeps until something happens;
+    elsewhere, or if inotify is unavailable, the directory is polled. Either way a file is only
+    reported once its size and modification time stayed the same for ``settle_seconds``, so files
+    that are still being uploaded or copied are never picked up half-written. Files present when
+    watching starts are reported as well, after the same delay.
+    """
+
+    def __init__(self, directory: str, settle_seconds: float = 5.0, poll_interval: float = 2.0,
+                 rescan_interval: float = 60.0, suffix: str = ".pdf"):
+        """
+        Args:
+            directory (str): Directory to watch.
+            settle_seconds (float): Time a file must stay unchanged before it is reported.
+            poll_interval (float): Time between directory scans when inotify is unavailable.
+            rescan_interval (float): Time between directory scans with inotify, to catch events it cannot
+                see, such as changes made by another machine on a network share.
+            suffix (str): File name suffix of the watched files, compared case-insensitively.
+        """
+        self.directory = directory
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.suffix = suffix.lower()
+        self.logger = get_logger()
+        # (size, mtime) of every reported file, and of every file waiting to settle with the time it was first seen
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        self._settling: Dict[str, Tuple[Tuple[int, int], float]] = {}
+
+    def watch(self, stop: threading.Event) -> Iterator[Tuple[List[str], List[str]]]:
+        """
+        Report changes of the directory until ``stop`` is set.
+
+        Args:
+            stop (threading.Event): Event that ends watching.
+
+        Yields:
+            Tuple[List[str], List[str]]: Paths of files that are new or changed and have settled, and
+            paths of reported files that were removed.
+        """
+        inotify = self._open_inotify()
+        try:
+            while not stop.is_set():
+                ready, removed = self.scan()
+                if ready or removed:
+                    yield ready, removed
+                timeout = self.rescan_interval if inotify else self.poll_interval
+                if self._settling:
+                    now = time.monotonic()
+                    timeout = min(timeout, max(0.0, min(since + self.settle_seconds - now
+                                                        for _, since in self._settling.values())))
+                self._wait(inotify, stop, timeout)
+        finally:
+            if inotify:
+                inotify.close()
+
+    def scan(self) -> Tuple[List[str], List[str]]:
+        """Scan the directory once and return the files that settled and the reported files that were removed."""
+        now = time.monotonic()
+        present: Dict[str, Tuple[int, int]] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.name.lower().endswith(self.suffix):
+                    continue
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        present[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    # Removed or renamed while scanning
+                    continue
+
+        ready = []
+        for path, signature in present.items():
+            if self._reported.get(path) == signature:
+                self._settling.pop(path, None)
+                continue
+            settling = self._settling.get(path)
+            if settling is None or settling[0] != signature:
+                self._settling[path] = (signature, now)
+            elif now - settling[1] >= self.settle_seconds:
+                if signature[0] == 0:
+                    # Empty files are usually placeholders of an upload that has not started yet
+                    self._settling[path] = (signature, now)
+                    continue
+                del self._settling[path]
+                self._reported[path] = signature
+                ready.append(path)
+
+        removed = [path for path in self._reported if path not in present]
+        for path in removed:
+            del self._reported[path]
+        for path in [path for path in self._settling if path not in present]:
+            del self._settling[path]
+        return sorted(ready), sorted(removed)
+
+    def _open_inotify(self) -> Optional[_Inotify]:
+        if not sys.platform.startswith("linux"):
+            self.logger.info(f"Polling {self.directory} every {self.poll_interval:g}s")
+            return None
+        try:
+            inotify = _Inotify(self.directory)
+        except (OSError, AttributeError) as e:
+            self.logger.warning(f"inotify is unavailable ({e}); polling {self.directory} every {self.poll_interval:g}s")
+            return None
+        self.logger.info(f"Watching {self.directory} with inotify")
+        return inotify
+
+    @staticmethod
+    def _wait(inotify: Optional[_Inotify], stop: threading.Event, timeout: float):
+        """Sleep until an inotify event arrives, ``timeout`` passes or ``stop`` is set."""
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if inotify:
+                if inotify.wait(min(remaining, _MAX_WAIT)):
+                    return
+            else:
+                stop.wait(min(remaining, _MAX_WAIT))
@@ -1,17 +1,26 @@
 # src/services/openai_base_service.py
 import abc
-import base64
+import hashlib
+import json
 from itertools import islice
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any, Optional
 
 from openai import OpenAI
 from pydantic import BaseModel, Field
 
 from src.models import OpenAIResponse
+from src.models.message_template import MessageTemplate
 from src.models.page_content import PageContent
+from src.models.request_plan import RequestPlan
 from src.services.prompt_service import PromptService
+from src.services.request_scheduler import RequestScheduler
+from src.services.response_cache import ResponseCache
+from src.services.run_metrics import RunMetrics
 from src.services.schema_service import SchemaService
+from src.services.template_service import TemplateService
+from src.utils.image_payload import encode_data_url
 from src.utils.logging import get_logger
+from src.utils.tokens import DEFAULT_IMAGE_TOKENS, IMAGE_BASE_TOKENS, estimate_page_tokens, estimate_text_tokens
 
 
 class OpenAIBaseService(BaseModel, abc.ABC):
@@ -19,15 +28,34 @@ class OpenAIBaseService(BaseModel, abc.ABC):
 
     api_key: str
     model: str
+    # OpenAI-compatible endpoint, e.g. a proxy or the local benchmark server; None uses OPENAI_BASE_URL or OpenAI
+    base_url: Optional[str] = None
     client: OpenAI = Field(default=None, init=False)
     logger: Any = Field(default=None, init=False)
     prompt_service: PromptService
     schema_service: SchemaService
+    # Serves the system message and response format from memory; built from the two services if omitted
+    template_service: Optional[TemplateService] = None
+    scheduler: Optional[RequestScheduler] = None
+    response_cache: Optional[ResponseCache] = None
+    metrics: Optional[RunMetrics] = None
+    # Token budget of a single request: prompt, schema and page content must fit in max_input_tokens,
+    # and the whole request plus max_output_tokens must fit in the model's context window
+    max_input_tokens: Optional[int] = 16000
+    max_output_tokens: int = 4095
+    context_window: int = 128_000
 
     def __init__(self, **data):
         super().__init__(**data)
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
         self.logger = get_logger()
+        if self.scheduler is None:
+            self.scheduler = RequestScheduler()
+        if self.metrics is None:
+            self.metrics = RunMetrics(model=self.model)
+        if self.template_service is None:
+            self.template_service = TemplateService(prompt_service=self.prompt_service,
+                                                    schema_service=self.schema_service)
 
     @staticmethod
     def batch_iterator(iterable: List[Any], size: int):
@@ -36,19 +64,169 @@ class OpenAIBaseService(BaseModel, abc.ABC):
         while batch := list(islice(it, size)):
             yield batch
 
-    def prepare_content(self, page: PageContent) -> Dict[str, Any]:
-        """Prepare content for OpenAI API."""
+    @staticmethod
+    def pack_pages(pages: Iterable[PageContent], max_pages: int,
+                   max_tokens: Optional[int] = None) -> Iterator[List[PageContent]]:
+        """
+        Greedily group consecutive pages into requests.
+
+        A group is closed once it holds ``max_pages`` pages or the next page would push its
+        estimated input tokens past ``max_tokens``. A single page larger than the budget still
+        forms a group of its own.
+        """
+        group: List[PageContent] = []
+        group_tokens = 0
+        for page in pages:
+            page_tokens = estimate_page_tokens(page)
+            if group and (len(group) >= max_pages or
+                          (max_tokens is not None and group_tokens + page_tokens > max_tokens)):
+                yield group
+                group, group_tokens = [], 0
+            group.append(page)
+            group_tokens += page_tokens
+        if group:
+            yield group
+
+    def input_token_budget(self, system_prompt: str, json_schema: Dict[str, Any]) -> int:
+        """
+        Compute how many input tokens of page content fit into a single request.
+
+        Args:
+            system_prompt (str): System prompt sent with every request.
+            json_schema (Dict[str, Any]): Response format schema sent with every request.
+
+        Returns:
+            int: Token budget for the pages of one request.
+        """
+        budget = self.context_window - self.max_output_tokens
+        if self.max_input_tokens is not None:
+            budget = min(budget, self.max_input_tokens)
+        return max(1, budget - self.prompt_tokens(system_prompt, json_schema))
+
+    @staticmethod
+    def prompt_tokens(system_prompt: str, json_schema: Dict[str, Any]) -> int:
+        """Estimate the input tokens every request spends on the system prompt and schema."""
+        return estimate_text_tokens(system_prompt) + estimate_text_tokens(json.dumps(json_schema))
+
+    def plan_chunks(self, pages: Iterable[PageContent], max_pages: int, language: str = "english",
+                    plan: Optional[RequestPlan] = None) -> Iterator[List[PageContent]]:
+        """
+        Pack consecutive pages into chunks that are sent as one request each.
+
+        This is the only place that decides how pages map to requests. A chunk holds at most
+        ``max_pages`` pages and stays within the input token budget left after the system prompt
+        and schema, with ``max_output_tokens`` reserved for the response.
+
+        Args:
+            pages (Iterable[PageContent]): Pages in order; may be a rendering stream.
+            max_pages (int): Maximum number of pages per chunk.
+            language (str): Language of the study set, which selects the system prompt.
+            plan (Optional[RequestPlan]): If given, every planned chunk is recorded in it.
+
+        Yields:
+            List[PageContent]: The chunks, in page order.
+        """
+        template = self.template_service.get(language)
+        budget = self.input_token_budget(template.system_prompt, template.json_schema)
+        overhead = self.prompt_tokens(template.system_prompt, template.json_schema)
+        for chunk in self.pack_pages(pages, max_pages, budget):
+            if plan is not None:
+                plan.add(len(chunk), overhead + sum(estimate_page_tokens(page) for page in chunk))
+            yield chunk
+
+    @staticmethod
+    def image_url_prefix(page: PageContent) -> str:
+        """Return the data URL prefix that precedes a page's base64 image data."""
+        return f"data:{page.image_mime_type or 'image/jpeg'};base64,"
+
+    def prepare_content(self, page: PageContent) -> List[Dict[str, Any]]:
+        """
+        Prepare the content parts of a page for the OpenAI API.
+
+        Text-only and image-only pages produce a single part; pages sent as text with cropped
+        figures produce their text followed by the figure image.
+        """
+        parts = []
+        with self.metrics.time("prepare"):
+            if page.text is not None or not page.image_data:
+                parts.append({"type": "text", "text": page.text or ""})
+            if page.image_data:
+                prefix = self.image_url_prefix(page)
+                image_url = {"url": encode_data_url(prefix, page.image_data)}
+                if page.image_detail:
+                    image_url["detail"] = page.image_detail
+                parts.append({"type": "image_url", "image_url": image_url})
+                self.metrics.count(base64_bytes=len(image_url["url"]) - len(prefix))
+        return parts
+
+    def content_signature(self, page: PageContent) -> List[Dict[str, Any]]:
+        """
+        Describe the content parts of a page for cache keys without base64-encoding the image.
+
+        Images are represented by the digest of their raw bytes, which identifies the content sent
+        by ``prepare_content`` just as well and lets the batch writer stream images straight to disk.
+        """
+        parts = []
+        if page.text is not None or not page.image_data:
+            parts.append({"type": "text", "text": page.text or ""})
         if page.image_data:
-            image_base64 = base64.b64encode(page.image_data).decode('utf-8')
-            return {
+            parts.append({
                 "type": "image_url",
-                "image_url": {"url": f"data:image/png;base64,{image_base64}"}
-            }
-        return {"type": "text", "text": page.text or ""}
+                "image_url": {
+                    "prefix": self.image_url_prefix(page),
+                    "sha256": hashlib.sha256(page.image_data).hexdigest(),
+                    "detail": page.image_detail
+                }
+            })
+        return parts
+
+    def cache_key(self, template: MessageTemplate, pages: List[PageContent]) -> str:
+        """Compute the response cache key for a request covering the given pages."""
+        content = [part for page in pages for part in self.content_signature(page)]
+        return ResponseCache.make_key(self.model, template.language, template.system_prompt, template.json_schema,
+                                      content)
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+        """Roughly estimate the tokens a request counts against the TPM limit."""
+        tokens = max_tokens
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                tokens += estimate_text_tokens(content)
+                continue
+            for part in content:
+                if part["type"] == "text":
+                    tokens += estimate_text_tokens(part["text"])
+                elif part["image_url"].get("detail") == "low":
+                    tokens += IMAGE_BASE_TOKENS
+                else:
+                    tokens += DEFAULT_IMAGE_TOKENS
+        return tokens
+
+    def create_chat_completion(self, **kwargs) -> Any:
+        """
+        Send a chat completion request through the shared request scheduler.
+
+        The scheduler owns pacing and retries, so the client's own retry loop is disabled here. The
+        time until the response arrives, including pacing and retries, is recorded as the request
+        stage together with the token usage the API reports.
+        """
+        estimated_tokens = self.estimate_tokens(kwargs["messages"], kwargs.get("max_tokens", 0))
+        client = self.client.with_options(max_retries=0)
+        with self.metrics.time("request"):
+            raw_response = self.scheduler.execute(
+                lambda: client.chat.completions.with_raw_response.create(**kwargs),
+                estimated_tokens
+            )
+            response = raw_response.parse()
+        self.metrics.count(requests=1)
+        self.metrics.record_usage(getattr(response, "usage", None))
+        return response
 
     @abc.abstractmethod
     def generate_study_cards(self, pages: List[PageContent], batch_size: int = 10, language:str = "english") -> OpenAIResponse:
-        """Generate study cards from page content."""
+        """Generate study cards from page content, planning requests of at most ``batch_size`` pages."""
         pass
 
     class Config:
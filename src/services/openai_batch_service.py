@@ -1,12 +1,30 @@
 # src/services/openai_batch_service.py
 import csv
 import json
-import time
-from typing import List, Dict, Any, Optional
+import os
+import re
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Dict, Any, Optional
 
+from pydantic import PrivateAttr
+
+from src.models.batch_shard import BatchShard
+from src.models.batch_task import BatchTask
+from src.models.job_status import JobStatus
+from src.models.message_template import MessageTemplate
+from src.models.card_record import CardRecord
 from src.models.openai_response import OpenAIResponse
 from src.models.page_content import PageContent
+from src.models.request_plan import RequestPlan
+from src.services.batch_poller import BatchPoller
 from src.services.openai_base_service import OpenAIBaseService
+from src.utils.card_records import dump_cards, parse_cards, to_response
+from src.utils.image_payload import base64_length, iter_base64
+
+# Bytes read per chunk when downloading batch output files
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class OpenAIBatchService(OpenAIBaseService):
@@ -14,142 +32,453 @@ class OpenAIBatchService(OpenAIBaseService):
 
     batch_file_name: str = "batch_tasks.jsonl"
     results_file_name: str = "batch_output.jsonl"
+    # Batch API limits per input file, with some headroom on the byte limit
+    max_shard_requests: int = 50_000
+    max_shard_bytes: int = 190 * 1024 * 1024
+    max_parallel_uploads: int = 4
+    poll_interval: float = 5.0
+    max_poll_interval: float = 300.0
+
+    # Cache keys of the tasks served from the response cache and of the tasks actually submitted
+    _cached_task_keys: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _task_cache_keys: Dict[str, str] = PrivateAttr(default_factory=dict)
 
     def generate_study_cards(self, pages: List[PageContent], batch_size: int = 10,
                              language: str = "english") -> OpenAIResponse:
-        batch_job_id = self.create_batch_job(pages, batch_size, language)
-        batch_results = self.retrieve_batch_results(batch_job_id)
-        return self.parse_batch_results(batch_results)
-
-    def create_batch_job(self, pages: List[PageContent], batch_size: int = 10, language: str = "english",
-                         pdf_mapping: Optional[Dict[str, str]] = None) -> str:
-        self.logger.info("Creating batch file for processing")
-        tasks = []
-
-        system_prompt = self.prompt_service.load_prompt(language)
-        json_schema = self.schema_service.load_schema()
-
-        for index, page in enumerate(pages):
-            batch_content = [self.prepare_content(page)]
-            if pdf_mapping:
-                # Use the custom_id from pdf_mapping
-                custom_id = list(pdf_mapping.keys())[index]
-            else:
-                custom_id = f"task-{index}"
-
-            task = {
-                "custom_id": custom_id,
-                "method": "POST",
-                "url": "/v1/chat/completions",
-                "body": {
-                    "model": self.model,
-                    "temperature": 1,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": batch_content}
-                    ],
-                    "max_tokens": 4095,
-                    "response_format": json_schema
-                }
-            }
-            tasks.append(task)
+        shards = self.create_batch_jobs(self.plan_tasks(pages, batch_size, language=language), language)
+        batch_results = [self.load_cached_results(self.cached_task_keys)]
+        batch_results.extend(self.retrieve_batch_results(shard.job_id) for shard in shards)
+        return self.parse_batch_results(chain.from_iterable(batch_results))
+
+    def plan_tasks(self, pages: Iterable[PageContent], batch_size: int = 10, id_prefix: str = "task",
+                   language: str = "english", plan: Optional[RequestPlan] = None) -> Iterator[BatchTask]:
+        """
+        Pack consecutive pages into multi-page batch tasks.
 
-        with open(self.batch_file_name, 'w') as file:
-            for task in tasks:
-                file.write(json.dumps(task) + '\n')
+        Each task holds at most ``batch_size`` pages and stays within the request's input token
+        budget, so the system prompt and schema are sent once per group instead of once per page.
+        Pages are consumed lazily, so ``pages`` may be a rendering stream.
 
-        batch_file = self.client.files.create(file=open(self.batch_file_name, "rb"), purpose="batch")
-        self.logger.info(f"Batch file uploaded with ID: {batch_file.id}")
+        Args:
+            pages (Iterable[PageContent]): Pages of a single PDF, in order.
+            batch_size (int): Maximum number of pages per task.
+            id_prefix (str): Prefix of the task custom_ids, unique per PDF within a batch job.
+            language (str): Language of the study set.
+            plan (Optional[RequestPlan]): If given, every planned task is recorded in it.
+
+        Yields:
+            BatchTask: The planned tasks, in page order.
+        """
+        for group in self.plan_chunks(pages, batch_size, language, plan):
+            yield BatchTask(custom_id=f"{id_prefix}_pages_{group[0].page_number}-{group[-1].page_number}", pages=group)
+
+    @property
+    def cached_task_keys(self) -> Dict[str, str]:
+        """Cache keys of the tasks of the last ``create_batch_jobs`` call that were served from the cache."""
+        return dict(self._cached_task_keys)
+
+    @property
+    def task_cache_keys(self) -> Dict[str, str]:
+        """
+        Cache keys of the tasks submitted by the last ``create_batch_jobs`` call.
+
+        Their results are stored under these keys once parsed. A run resuming the jobs in a new process
+        hands the saved mapping back with ``restore_task_cache_keys``.
+        """
+        return dict(self._task_cache_keys)
+
+    def restore_task_cache_keys(self, task_cache_keys: Dict[str, str]):
+        """Restore the cache keys of tasks submitted by an earlier process, so their results are cached."""
+        self._task_cache_keys = dict(task_cache_keys)
+
+    def create_batch_jobs(self, tasks: Iterable[BatchTask], language: str = "english",
+                          on_submitted: Optional[Callable[[List[BatchShard]], None]] = None) -> List[BatchShard]:
+        """
+        Write the given tasks into batch files and submit one batch job per file.
+
+        Tasks are split into shards that respect the Batch API's per-file request and size limits.
+        Each shard is uploaded and submitted in the background as soon as it is full, while the next
+        one is being written. Files are written one task at a time with image data base64-encoded
+        straight into the file, so memory stays flat no matter how many pages are covered.
+
+        Tasks whose response is already in the response cache are not submitted; their cache keys
+        are available from ``cached_task_keys`` and their results from ``load_cached_results``. The
+        cache keys of submitted tasks are available from ``task_cache_keys`` and should be saved
+        with the shards.
+
+        Args:
+            tasks (Iterable[BatchTask]): Tasks to submit; may be a lazily produced stream.
+            language (str): Language of the study set.
+            on_submitted (Optional[Callable[[List[BatchShard]], None]]): Called on the calling thread with
+                every shard submitted so far whenever more shards were submitted, so they can be saved
+                before the rest is done. If a submission fails or ``tasks`` raises, the shards already
+                submitted are still reported before the error is raised.
+
+        Returns:
+            List[BatchShard]: The submitted shards, empty if every task was served from the cache.
+        """
+        self.logger.info("Creating batch files for processing")
+        self._cached_task_keys = {}
+        self._task_cache_keys = {}
+        task_count = page_count = 0
+
+        template = self.template_service.get(language)
+        line_overhead = len(json.dumps(template.system_prompt)) + len(json.dumps(template.json_schema)) + 512
+
+        submissions: List[Future] = []
+        shards: List[BatchShard] = []
+        errors: List[Exception] = []
+        shard_file: Optional[BinaryIO] = None
+        shard_ids: List[str] = []
+        shard_count = 0
+
+        def collect(wait: bool):
+            # Results are handed over on this thread, so the caller may save state it keeps mutating
+            finished = [submission for submission in submissions if wait or submission.done()]
+            submitted = []
+            for submission in finished:
+                submissions.remove(submission)
+                try:
+                    submitted.append(submission.result())
+                except Exception as e:
+                    errors.append(e)
+            if submitted:
+                shards.extend(submitted)
+                if on_submitted:
+                    on_submitted(list(shards))
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_uploads) as executor:
+            try:
+                for task in tasks:
+                    collect(wait=False)
+                    if errors:
+                        break
+                    task_count += 1
+                    page_count += len(task.pages)
+
+                    if self.response_cache:
+                        cache_key = self.cache_key(template, task.pages)
+                        if self.response_cache.get(cache_key) is not None:
+                            self._cached_task_keys[task.custom_id] = cache_key
+                            continue
+                        self._task_cache_keys[task.custom_id] = cache_key
+
+                    line_bytes = line_overhead + self._estimate_task_bytes(task)
+                    if shard_file and (len(shard_ids) >= self.max_shard_requests
+                                       or shard_file.tell() + line_bytes > self.max_shard_bytes):
+                        shard_file.close()
+                        submissions.append(executor.submit(self._submit_shard, shard_file.name, shard_ids))
+                        shard_file = None
+
+                    if shard_file is None:
+                        shard_file = open(self._shard_file_name(shard_count), 'wb')
+                        shard_count += 1
+                        shard_ids = []
+
+                    self._write_task(shard_file, task, template)
+                    shard_ids.append(task.custom_id)
+
+                if shard_file and not errors:
+                    shard_file.close()
+                    submissions.append(executor.submit(self._submit_shard, shard_file.name, shard_ids))
+                    shard_file = None
+            finally:
+                if shard_file:
+                    # A shard cut short by an error is never submitted
+                    shard_file.close()
+                    os.remove(shard_file.name)
+                collect(wait=True)
+
+        if errors:
+            self.logger.error(f"Submitting batch jobs failed after {len(shards)} jobs were created")
+            raise errors[0]
+
+        self.logger.info(f"Submitted {task_count - len(self._cached_task_keys)} of {task_count} tasks "
+                         f"covering {page_count} pages in {len(shards)} batch jobs")
+        if self._cached_task_keys:
+            self.logger.info(f"{len(self._cached_task_keys)} of {task_count} tasks served from the response cache")
+        return shards
+
+    def _shard_file_name(self, index: int) -> str:
+        stem, extension = os.path.splitext(self.batch_file_name)
+        return f"{stem}_{index}{extension}"
+
+    def _submit_shard(self, file_name: str, custom_ids: List[str]) -> BatchShard:
+        """Upload a finished shard file and create its batch job."""
+        with open(file_name, "rb") as file:
+            batch_file = self.client.files.create(file=file, purpose="batch")
+        self.logger.info(f"Batch file {file_name} uploaded with ID: {batch_file.id}")
+        os.remove(file_name)
 
         batch_job = self.client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
                                                completion_window="24h")
-        self.logger.info(f"Batch job created with ID: {batch_job.id}")
-        return batch_job.id
+        self.logger.info(f"Batch job created with ID: {batch_job.id} ({len(custom_ids)} tasks)")
+        return BatchShard(job_id=batch_job.id, custom_ids=custom_ids)
 
-    def retrieve_batch_results(self, batch_job_id: str) -> List[Dict[str, Any]]:
-        self.logger.info("Checking batch job status...")
-        batch_job = self.client.batches.retrieve(batch_job_id)
+    @staticmethod
+    def _estimate_task_bytes(task: BatchTask) -> int:
+        """Upper-bound the serialized size of a task's user content."""
+        size = 0
+        for page in task.pages:
+            if page.image_data:
+                size += base64_length(len(page.image_data)) + 128
+            # JSON escaping can expand non-ASCII text to six bytes per character
+            size += 6 * len(page.text or "") + 64
+        return size
 
-        while batch_job.status != 'completed':
-            self.logger.info(f"Batch job status: {batch_job.status}. Waiting for completion...")
-            time.sleep(10)
-            batch_job = self.client.batches.retrieve(batch_job_id)
+    def _write_task(self, file: BinaryIO, task: BatchTask, template: MessageTemplate):
+        """
+        Write one task as a JSONL line, streaming image data into the file.
 
-        self.logger.info("Batch job completed. Retrieving results...")
-        result_file_id = batch_job.output_file_id
-        result_content = self.client.files.content(result_file_id).text
+        The line is serialized with a unique placeholder in place of each image URL; the JSON is then
+        written around the placeholders while the image bytes are base64-encoded in chunks between them.
+        """
+        marker = uuid.uuid4().hex
+        images: Dict[str, PageContent] = {}
+        batch_content = []
+        for index, page in enumerate(task.pages):
+            if page.text is not None or not page.image_data:
+                batch_content.append({"type": "text", "text": page.text or ""})
+            if page.image_data:
+                placeholder = f"@@{marker}-{index}@@"
+                images[placeholder] = page
+                image_url = {"url": placeholder}
+                if page.image_detail:
+                    image_url["detail"] = page.image_detail
+                batch_content.append({"type": "image_url", "image_url": image_url})
 
-        with open(self.results_file_name, 'w') as file:
-            file.write(result_content)
+        line = json.dumps({
+            "custom_id": task.custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "temperature": 1,
+                "messages": [template.system_message, {"role": "user", "content": batch_content}],
+                "max_tokens": self.max_output_tokens,
+                "response_format": template.json_schema
+            }
+        })
 
-        return self._load_results()
+        with self.metrics.time("prepare"):
+            for segment in re.split(f"(@@{marker}-\\d+@@)", line):
+                page = images.get(segment)
+                if page is None:
+                    file.write(segment.encode('utf-8'))
+                    continue
+                file.write(self.image_url_prefix(page).encode('ascii'))
+                for encoded in iter_base64(page.image_data):
+                    file.write(encoded)
+                self.metrics.count(base64_bytes=base64_length(len(page.image_data)))
+            file.write(b'\n')
+
+    @staticmethod
+    def _as_batch_result(custom_id: str, study_cards: List[CardRecord]) -> Dict[str, Any]:
+        """Wrap cached cards in the shape of a batch output line."""
+        return {
+            "custom_id": custom_id,
+            "response": {"body": {"choices": [{"message": {"content": dump_cards(study_cards)}}]}}
+        }
 
-    def _load_results(self) -> List[Dict[str, Any]]:
+    def load_cached_results(self, cached_task_keys: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Load the results of tasks that were served from the response cache.
+
+        Args:
+            cached_task_keys (Dict[str, str]): Mapping from custom_id to cache key.
+
+        Returns:
+            List[Dict[str, Any]]: Results in the shape of batch output lines.
+        """
         results = []
-        with open(self.results_file_name, 'r') as file:
-            for line in file:
-                results.append(json.loads(line.strip()))
+        for custom_id, cache_key in cached_task_keys.items():
+            cached = self.response_cache.get(cache_key) if self.response_cache else None
+            if cached is None:
+                self.logger.error(f"Cached result for task {custom_id} is no longer available")
+                continue
+            results.append(self._as_batch_result(custom_id, cached))
         return results
 
-    def parse_batch_results(self, batch_results: List[Dict[str, Any]]) -> OpenAIResponse:
-        all_study_cards = []
-        for res in batch_results:
+    def poll_batch_jobs(self, job_ids: Iterable[str], wait: bool = True) -> Iterator[Any]:
+        """
+        Yield batch jobs as they reach a terminal status.
+
+        Args:
+            job_ids (Iterable[str]): Identifiers of the batch jobs to monitor.
+            wait (bool): If False, check every job once and only yield those already finished.
+
+        Yields:
+            Batch: The retrieved batch object of each finished job.
+        """
+        poller = BatchPoller(self.client, initial_interval=self.poll_interval, max_interval=self.max_poll_interval)
+        yield from poller.poll(job_ids, wait)
+
+    def retrieve_batch_results(self, batch_job_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Wait for a batch job and lazily yield its results.
+
+        The downloaded output file is deleted once the results are exhausted or the iterator is closed.
+        """
+        for batch_job in self.poll_batch_jobs([batch_job_id]):
+            results_file = self.download_batch_results(batch_job)
+            if not results_file:
+                return
             try:
-                result_content = res['response']['body']['choices'][0]['message']['content']
-                study_cards = OpenAIResponse.model_validate_json(result_content)
-                all_study_cards.extend(study_cards.study_cards)
-            except Exception as e:
-                self.logger.error(f"Error parsing result for task {res.get('custom_id', 'unknown')}: {e}")
-        return OpenAIResponse(study_cards=all_study_cards)
+                yield from self.iter_batch_results(results_file)
+            finally:
+                os.remove(results_file)
+            return
+
+    def download_batch_results(self, batch_job: Any) -> Optional[str]:
+        """
+        Stream the output file of a finished batch job to disk.
+
+        Failed, expired and cancelled jobs are reported; whatever output they produced before
+        stopping is still downloaded.
+
+        Args:
+            batch_job (Batch): A batch object in a terminal status.
+
+        Returns:
+            Optional[str]: Path of the downloaded JSONL file, or None if the job produced no output.
+        """
+        if batch_job.status != JobStatus.COMPLETED:
+            self.logger.error(f"Batch job {batch_job.id} ended with status {batch_job.status}")
+        counts = getattr(batch_job, "request_counts", None)
+        if counts is not None and counts.failed:
+            self.logger.error(f"{counts.failed} of {counts.total} requests of batch job {batch_job.id} failed")
+
+        if not batch_job.output_file_id:
+            return None
 
-    # src/services/openai_batch_service.py
+        self.logger.info(f"Batch job {batch_job.id} finished. Retrieving results...")
+        stem, extension = os.path.splitext(self.results_file_name)
+        results_file = f"{stem}_{batch_job.id}{extension}"
+        with self.client.files.with_streaming_response.content(batch_job.output_file_id) as response:
+            with open(results_file, 'wb') as file:
+                for chunk in response.iter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+        return results_file
 
-    def parse_batch_results_with_mapping(self, batch_results: List[Dict[str, Any]], pdf_mapping: Dict[str, str]):
+    @staticmethod
+    def iter_batch_results(results_file: str) -> Iterator[Dict[str, Any]]:
+        """Lazily parse a batch output file line by line."""
+        with open(results_file, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def index_batch_results(results_file: str) -> Dict[str, int]:
+        """
+        Map each custom_id in a batch output file to the byte offset of its line.
+
+        Only the offsets are kept, so results can later be read back in any order without holding
+        the output in memory.
         """
-        Parse batch results and save study cards to their respective CSV files based on mapping.
+        offsets = {}
+        with open(results_file, 'rb') as file:
+            offset = 0
+            for line in file:
+                if line.strip():
+                    custom_id = json.loads(line).get('custom_id')
+                    if custom_id:
+                        offsets[custom_id] = offset
+                offset += len(line)
+        return offsets
+
+    @staticmethod
+    def read_batch_result(results_file: str, offset: int) -> Dict[str, Any]:
+        """Read the batch output line starting at ``offset``."""
+        with open(results_file, 'rb') as file:
+            file.seek(offset)
+            return json.loads(file.readline())
+
+    def _cache_result(self, custom_id: Optional[str], study_cards: List[CardRecord]):
+        """Store the cards of a freshly parsed batch result in the response cache."""
+        cache_key = self._task_cache_keys.get(custom_id)
+        if self.response_cache and cache_key:
+            self.response_cache.put(cache_key, study_cards)
+
+    def parse_batch_result(self, res: Dict[str, Any]) -> Optional[List[CardRecord]]:
+        """
+        Parse and validate the study cards of one batch output line.
+
+        All cards of the line are validated in one pass into compact records, without building a
+        model per card.
 
         Args:
-            batch_results (List[Dict[str, Any]]): List of batch result dictionaries.
-            pdf_mapping (Dict[str, str]): Mapping from custom_id to output CSV path.
+            res (Dict[str, Any]): A batch result dictionary.
+
+        Returns:
+            Optional[List[CardRecord]]: The task's study cards, or None if the result is unusable.
         """
-        study_cards_per_file = {}
+        custom_id = res.get('custom_id')
+        try:
+            if not custom_id:
+                self.logger.error("Missing custom_id in batch result.")
+                return None
+            result_content = res['response']['body']['choices'][0]['message']['content']
+            with self.metrics.time("parse"):
+                study_cards = parse_cards(result_content)
+            # Results served from the response cache carry no usage and cost nothing
+            usage = res['response']['body'].get('usage')
+            if usage is not None:
+                self.metrics.count(requests=1)
+                self.metrics.record_usage(usage)
+            self._cache_result(custom_id, study_cards)
+            return study_cards
+        except Exception as e:
+            self.logger.error(f"Error parsing result for task {custom_id or 'unknown'}: {e}")
+            return None
 
+    def parse_batch_results(self, batch_results: Iterable[Dict[str, Any]]) -> OpenAIResponse:
+        all_study_cards = []
         for res in batch_results:
-            try:
-                custom_id = res.get('custom_id')
-                if not custom_id:
-                    self.logger.error("Missing custom_id in batch result.")
-                    continue
-                result_content = res['response']['body']['choices'][0]['message']['content']
-                study_cards = OpenAIResponse.model_validate_json(result_content).study_cards
+            all_study_cards.extend(self.parse_batch_result(res) or [])
+        return to_response(all_study_cards)
 
-                output_csv = pdf_mapping.get(custom_id)
-                if not output_csv:
-                    self.logger.error(f"No mapping found for custom_id: {custom_id}")
-                    continue
+    def parse_batch_results_with_mapping(self, batch_results: Iterable[Dict[str, Any]], pdf_mapping: Dict[str, str]):
+        """
+        Parse batch results and append study cards to their respective CSV files based on mapping.
 
-                if output_csv not in study_cards_per_file:
-                    study_cards_per_file[output_csv] = []
-                study_cards_per_file[output_csv].extend(study_cards)
-            except Exception as e:
-                self.logger.error(f"Error processing batch result for custom_id {custom_id}: {e}")
+        Results are consumed one at a time and their cards appended straight to the CSV, so the
+        output of arbitrarily large jobs is processed in constant memory. Cards appear in the order
+        the Batch API returned the results.
+
+        Args:
+            batch_results (Iterable[Dict[str, Any]]): Batch result dictionaries, e.g. from ``iter_batch_results``.
+            pdf_mapping (Dict[str, str]): Mapping from custom_id to output CSV path.
+        """
+        started_files = set()
+        for res in batch_results:
+            custom_id = res.get('custom_id')
+            output_csv = pdf_mapping.get(custom_id)
+            if not output_csv:
+                self.logger.error(f"No mapping found for custom_id: {custom_id}")
+                continue
+            study_cards = self.parse_batch_result(res)
+            if study_cards is None:
+                continue
+            self._save_csv(study_cards, output_csv, append=output_csv in started_files)
+            started_files.add(output_csv)
 
-        # Save study cards to their respective CSV files
-        for output_csv, study_cards in study_cards_per_file.items():
-            self._save_csv(study_cards, output_csv)
+        for output_csv in started_files:
             self.logger.info(f"Study set saved to {output_csv}")
 
-    def _save_csv(self, study_cards: List[OpenAIResponse], output_csv: str):
+    def _save_csv(self, study_cards: Iterable[CardRecord], output_csv: str, append: bool = False):
         """
         Save study cards to a CSV file.
 
         Args:
-            study_cards (List[OpenAIResponse]): List of study cards to save.
+            study_cards (Iterable[CardRecord]): Study cards to save.
             output_csv (str): Path to the output CSV file.
+            append (bool): If True, append to an existing CSV instead of starting a new one.
         """
-        with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
+        with open(output_csv, 'a' if append else 'w', newline='', encoding='utf-8') as csvfile:
             fieldnames = ['Question', 'Answer']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+            if not append:
+                writer.writeheader()
             for card in study_cards:
                 writer.writerow({'Question': card.question, 'Answer': card.answer})
@@ -2,8 +2,10 @@
 from typing import List
 
 from src.models import OpenAIResponse
+from src.models.card_record import CardRecord
 from src.models.page_content import PageContent
 from src.services.openai_base_service import OpenAIBaseService
+from src.utils.card_records import parse_cards, to_response
 
 
 class OpenAIDirectService(OpenAIBaseService):
@@ -11,27 +13,55 @@ class OpenAIDirectService(OpenAIBaseService):
 
     def generate_study_cards(self, pages: List[PageContent], batch_size: int = 10, language:str="english") -> OpenAIResponse:
         cards = []
-        system_prompt = self.prompt_service.load_prompt(language)
-        json_schema = self.schema_service.load_schema()
-
-        for batch in self.batch_iterator(pages, batch_size):
-            content = [self.prepare_content(page) for page in batch]
-            messages = [{"role": "system", "content": [{
-                "type": "text",
-                "text": system_prompt
-            }]}] + [{"role": "user", "content": content}]
-
+        for chunk in self.plan_chunks(pages, batch_size, language):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=1,
-                    max_tokens=4095,
-                    response_format=json_schema
-                )
-                study_cards = OpenAIResponse.model_validate_json(response.choices[0].message.content)
-                cards.extend(study_cards.study_cards)
-            except Exception as e:
+                cards.extend(self.generate_chunk(chunk, language))
+            except ValueError as e:
                 self.logger.error(f"Error generating study cards: {e}")
+        return to_response(cards)
+
+    def generate_chunk(self, pages: List[PageContent], language: str = "english") -> List[CardRecord]:
+        """
+        Generate study cards for one planned chunk of pages with a single request.
+
+        Args:
+            pages (List[PageContent]): A chunk produced by ``plan_chunks``.
+            language (str): Language of the study set.
+
+        Returns:
+            List[CardRecord]: The generated study cards.
+
+        Raises:
+            openai.APIError: If the request fails after the scheduler's retries.
+            ValueError: If the response holds no valid study cards, e.g. because it was cut off at
+                ``max_output_tokens``. Such a chunk has failed and must not be recorded as done.
+        """
+        template = self.template_service.get(language)
+
+        cache_key = None
+        if self.response_cache:
+            cache_key = self.cache_key(template, pages)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # The shared system message comes first so every request starts with the same cacheable prefix
+        content = [part for page in pages for part in self.prepare_content(page)]
+        messages = [template.system_message, {"role": "user", "content": content}]
 
-        return OpenAIResponse(study_cards=cards)
\ No newline at end of file
+        # API errors propagate once the scheduler gives up so the caller can retry the chunk later
+        response = self.create_chat_completion(
+            model=self.model,
+            messages=messages,
+            temperature=1,
+            max_tokens=self.max_output_tokens,
+            response_format=template.json_schema
+        )
+        try:
+            with self.metrics.time("parse"):
+                study_cards = parse_cards(response.choices[0].message.content or "")
+        except ValueError as e:
+            raise ValueError(f"Invalid study cards in response: {e}") from e
+        if cache_key:
+            self.response_cache.put(cache_key, study_cards)
+        return study_cards
@@ -0,0 +1,111 @@
+# src/services/page_classifier.py
+
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from pydantic import BaseModel, Field
+
+from src.models.page_kind import PageKind
+
+
+class PageClassifier(BaseModel):
+    """
+    Decides whether a PDF page is sent as text, as a full-page image or as text plus cropped figures.
+
+    Figures are embedded images and clusters of vector drawings that cover a meaningful part of the
+    page; small logos, icons and decorative lines are ignored so mostly-text pages stay cheap text.
+    Images too small to count on their own form one figure when together they cover enough of the
+    page, as scans stored as strips or tiles do. Pages whose figures dominate the layout, or that have
+    images but hardly any extractable text (scans, diagram slides), are rendered in full.
+    """
+
+    min_figure_coverage: float = Field(0.05, ge=0, le=1,
+                                       description="Fraction of the page an image, group of small images or "
+                                                   "drawing cluster must cover to count as a figure")
+    full_page_coverage: float = Field(0.5, ge=0, le=1,
+                                      description="Render the whole page once its figures cover this fraction")
+    min_text_chars: int = Field(40, ge=0,
+                                description="Pages with figures and less text than this are rendered in full")
+    min_figure_drawings: int = Field(20, ge=1,
+                                     description="Vector paths needed before drawings are treated as a figure")
+    background_coverage: float = Field(0.9, ge=0, le=1,
+                                       description="Drawings covering this fraction of the page are backgrounds")
+    figure_padding: float = Field(4.0, ge=0, description="Margin in points added around cropped figures")
+
+    def classify(self, page: fitz.Page, text: str) -> Tuple[PageKind, Optional[fitz.Rect]]:
+        """
+        Classify a page.
+
+        Args:
+            page (fitz.Page): The page to classify.
+            text (str): The page's extracted text.
+
+        Returns:
+            Tuple[PageKind, Optional[fitz.Rect]]: The page kind and, for pages with figures, the
+            region enclosing all of them.
+        """
+        page_rect = page.rect
+        page_area = abs(page_rect)
+        if not page_area:
+            return PageKind.TEXT, None
+
+        images = [bbox for bbox in (fitz.Rect(info["bbox"]) & page_rect for info in page.get_image_info())
+                  if not bbox.is_empty]
+        figures = self._figure_regions(page, page_rect, page_area, images)
+        if not figures:
+            # Images with no text to speak of are the page's content, however small each one is
+            if images and len(text.strip()) < self.min_text_chars:
+                return PageKind.IMAGE, None
+            return PageKind.TEXT, None
+
+        region = (self._enclosing(figures) + (-self.figure_padding, -self.figure_padding,
+                            self.figure_padding, self.figure_padding)) & page_rect
+
+        if len(text.strip()) < self.min_text_chars or abs(region) / page_area >= self.full_page_coverage:
+            return PageKind.IMAGE, None
+        return PageKind.TEXT_WITH_FIGURES, region
+
+    def _figure_regions(self, page: fitz.Page, page_rect: fitz.Rect, page_area: float,
+                        images: List[fitz.Rect]) -> List[fitz.Rect]:
+        figures, small_images = [], []
+        for bbox in images:
+            (figures if abs(bbox) / page_area >= self.min_figure_coverage else small_images).append(bbox)
+        # Strips or tiles of one picture only reach the coverage together; overlaps are counted once
+        if small_images and self._union_area(small_images) / page_area >= self.min_figure_coverage:
+            figures.append(self._enclosing(small_images))
+
+        # Drawings off the page intersect it as inverted rectangles. Straight lines are empty but valid,
+        # and chart axes and grids must still count.
+        drawings = [fitz.Rect(drawing["rect"]) & page_rect for drawing in page.get_drawings()]
+        drawings = [rect for rect in drawings if rect.is_valid and abs(rect) / page_area < self.background_coverage]
+        if len(drawings) >= self.min_figure_drawings:
+            cluster = self._enclosing(drawings)
+            if abs(cluster) / page_area >= self.min_figure_coverage:
+                figures.append(cluster)
+        return figures
+
+    @staticmethod
+    def _union_area(rects: List[fitz.Rect]) -> float:
+        """Area covered by the union of ``rects``, measured slab by slab between their x coordinates."""
+        xs = sorted({x for rect in rects for x in (rect.x0, rect.x1)})
+        area = 0.0
+        for left, right in zip(xs, xs[1:]):
+            spans = sorted((rect.y0, rect.y1) for rect in rects if rect.x0 <= left and rect.x1 >= right)
+            covered, top, bottom = 0.0, None, None
+            for y0, y1 in spans:
+                if bottom is None or y0 > bottom:
+                    if bottom is not None:
+                        covered += bottom - top
+                    top, bottom = y0, y1
+                else:
+                    bottom = max(bottom, y1)
+            if bottom is not None:
+                covered += bottom - top
+            area += covered * (right - left)
+        return area
+
+    @staticmethod
+    def _enclosing(rects: List[fitz.Rect]) -> fitz.Rect:
+        """Smallest rectangle containing all ``rects``, including degenerate ones such as straight lines."""
+        return fitz.Rect(min(rect.x0 for rect in rects), min(rect.y0 for rect in rects),
+                         max(rect.x1 for rect in rects), max(rect.y1 for rect in rects))
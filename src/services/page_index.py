@@ -0,0 +1,144 @@
+# src/services/page_index.py
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.models.card_record import CardRecord
+from src.utils.card_records import card_dicts, cards_from_dicts
+from src.utils.logging import get_logger
+
+# Maximum number of parameters bound in one lookup query
+_LOOKUP_BATCH = 500
+
+
+class PageIndex:
+    """
+    Persistent SQLite index of page fingerprints and the study cards generated for them.
+
+    Cards are generated per chunk of pages, so the index records every finished chunk together
+    with the fingerprints of its pages. A chunk can be reused by a later PDF when its pages reappear
+    there in the same order, which is what happens when slides are recycled across decks; its pages are
+    then skipped and its cards are taken from the index instead of asking the model again.
+
+    Entries are scoped by a namespace describing everything besides the pages that determines the
+    output (model, language, prompt, schema), so changing any of these never reuses stale cards.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = get_logger()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the threads of a run; every access goes through the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    fingerprints TEXT NOT NULL,
+                    study_cards TEXT NOT NULL,
+                    UNIQUE (namespace, fingerprints)
+                );
+                CREATE TABLE IF NOT EXISTS pages (
+                    namespace TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL REFERENCES chunks (id)
+                );
+                CREATE INDEX IF NOT EXISTS pages_by_fingerprint ON pages (namespace, fingerprint);
+            """)
+
+    def has_chunks(self, namespace: str) -> bool:
+        """Return whether any chunk has been recorded in a namespace."""
+        with self._lock:
+            row = self._connection.execute("SELECT 1 FROM chunks WHERE namespace = ? LIMIT 1", (namespace,)).fetchone()
+        return row is not None
+
+    def find_reusable(self, namespace: str, fingerprints: List[Optional[str]],
+                      exclude: Set[int]) -> List[Tuple[List[int], int]]:
+        """
+        Find recorded chunks whose pages occur in a document as a run of consecutive pages.
+
+        Larger chunks are matched first, every page is claimed by at most one chunk, and a chunk may
+        be matched more than once if its pages are repeated.
+
+        Args:
+            namespace (str): Namespace of the run.
+            fingerprints (List[Optional[str]]): Fingerprint of every page of the document, by page number;
+                pages without one are never claimed.
+            exclude (Set[int]): Page numbers that must not be claimed, e.g. because they are already done.
+
+        Returns:
+            List[Tuple[List[int], int]]: The consecutive page numbers claimed by each reusable chunk
+            and its id, ordered by first page.
+        """
+        pages_by_fingerprint: Dict[str, List[int]] = {}
+        for page_number, fingerprint in enumerate(fingerprints):
+            if fingerprint is not None and page_number not in exclude:
+                pages_by_fingerprint.setdefault(fingerprint, []).append(page_number)
+
+        candidates: Dict[int, List[str]] = {}
+        unique_fingerprints = list(pages_by_fingerprint)
+        for offset in range(0, len(unique_fingerprints), _LOOKUP_BATCH):
+            batch = unique_fingerprints[offset:offset + _LOOKUP_BATCH]
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT DISTINCT c.id, c.fingerprints FROM pages p JOIN chunks c ON c.id = p.chunk_id "
+                    f"WHERE p.namespace = ? AND p.fingerprint IN ({', '.join('?' * len(batch))})",
+                    [namespace, *batch]
+                ).fetchall()
+            candidates.update((chunk_id, json.loads(chunk_fingerprints)) for chunk_id, chunk_fingerprints in rows)
+
+        reusable = []
+        claimed: Set[int] = set()
+        for chunk_id, chunk_fingerprints in sorted(candidates.items(), key=lambda item: -len(item[1])):
+            # Recycled slides keep their order, so a chunk matches a run of consecutive pages
+            for first_page in pages_by_fingerprint.get(chunk_fingerprints[0], []):
+                pages = list(range(first_page, first_page + len(chunk_fingerprints)))
+                if all(page < len(fingerprints) and page not in exclude and page not in claimed
+                       and fingerprints[page] == fingerprint
+                       for page, fingerprint in zip(pages, chunk_fingerprints)):
+                    claimed.update(pages)
+                    reusable.append((pages, chunk_id))
+        return sorted(reusable)
+
+    def load_cards(self, chunk_id: int) -> List[CardRecord]:
+        """Return the study cards recorded for a chunk."""
+        with self._lock:
+            row = self._connection.execute("SELECT study_cards FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        if row is None:
+            self.logger.error(f"Chunk {chunk_id} is missing from the page index {self.path}")
+            return []
+        return cards_from_dicts(json.loads(row[0]))
+
+    def record(self, namespace: str, fingerprints: List[Optional[str]], study_cards: List[CardRecord]):
+        """
+        Record a finished chunk, unless one of its pages has no fingerprint.
+
+        Args:
+            namespace (str): Namespace of the run.
+            fingerprints (List[Optional[str]]): Fingerprints of the chunk's pages, in page order.
+            study_cards (List[CardRecord]): Cards generated for the chunk.
+        """
+        if any(fingerprint is None for fingerprint in fingerprints):
+            return
+        cards = json.dumps(card_dicts(study_cards))
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO chunks (namespace, fingerprints, study_cards) VALUES (?, ?, ?)",
+                (namespace, json.dumps(fingerprints), cards)
+            )
+            if cursor.rowcount:
+                self._connection.executemany(
+                    "INSERT INTO pages (namespace, fingerprint, chunk_id) VALUES (?, ?, ?)",
+                    [(namespace, fingerprint, cursor.lastrowid) for fingerprint in set(fingerprints)]
+                )
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
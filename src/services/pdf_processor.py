@@ -1,45 +1,287 @@
 # src/services/pdf_processor.py
 
+import hashlib
+import io
+import math
+import multiprocessing
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import fitz  # PyMuPDF
-from typing import List
+from typing import Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+from src.models.image_encoding import ImageEncoding
+from src.models.image_stats import ImageStats
 from src.models.page_content import PageContent
+from src.models.page_kind import PageKind
+from src.services.page_classifier import PageClassifier
+from src.services.run_metrics import RunMetrics
+
+
+T = TypeVar("T")
+
+# Short side in pixels of the grayscale rendering hashed into a page fingerprint
+FINGERPRINT_RESOLUTION = 128
+# Pages without text whose fingerprint rendering has less entropy than this (in bits) get no fingerprint
+FINGERPRINT_MIN_ENTROPY = 1.0
+
+
+def _entropy(samples: memoryview) -> float:
+    """Shannon entropy in bits of the byte values of a grayscale image."""
+    counts = Counter(samples.tobytes())
+    total = len(samples)
+    return -sum(count / total * math.log2(count / total) for count in counts.values()) if total else 0.0
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, text_only: bool, classifier: PageClassifier,
+                        encoding: ImageEncoding, fingerprint: bool) -> List[Tuple[PageContent, float]]:
+    """Extract a range of pages in a worker process, which opens its own copy of the document."""
+    with fitz.open(pdf_path) as doc:
+        return [PDFProcessor._timed_extract_page(doc[page_num], page_num, text_only, classifier, encoding,
+                                                 fingerprint)
+                for page_num in range(start, stop)]
+
+
+def _fingerprint_page_range(pdf_path: str, start: int, stop: int, text_only: bool,
+                            classifier: PageClassifier) -> List[Optional[str]]:
+    """Fingerprint a range of pages in a worker process, which opens its own copy of the document."""
+    with fitz.open(pdf_path) as doc:
+        fingerprints = []
+        for page_num in range(start, stop):
+            page = doc[page_num]
+            text = page.get_text()
+            kind = PageKind.TEXT if text_only else classifier.classify(page, text)[0]
+            fingerprints.append(PDFProcessor._fingerprint_page(page, text, kind))
+        return fingerprints
+
+
+def encode_pixmap(pix: fitz.Pixmap, encoding: ImageEncoding) -> bytes:
+    """
+    Encode a rendered pixmap in the format of an image encoding profile.
+
+    Raises:
+        ImportError: If WebP is requested and Pillow is not installed.
+    """
+    if encoding.format == "png":
+        return pix.tobytes(output='png')
+    if encoding.format == "jpeg":
+        return pix.tobytes(output='jpeg', jpg_quality=encoding.quality)
+
+    # PyMuPDF cannot write WebP; Pillow is an optional dependency needed only for this format.
+    # samples_mv exposes the pixels without copying them as pix.samples would.
+    from PIL import Image
+    image = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples_mv)
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=encoding.quality)
+    return buffer.getvalue()
+
 
 class PDFProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, workers: int = 1, classifier: Optional[PageClassifier] = None,
+                 encoding: Optional[ImageEncoding] = None, metrics: Optional[RunMetrics] = None):
+        """
+        Args:
+            workers (int): Number of processes used to render pages, shared by all PDFs rendered at once.
+                With 1, pages are rendered in-process.
+            classifier (Optional[PageClassifier]): Decides how each page is sent. Defaults to the standard thresholds.
+            encoding (Optional[ImageEncoding]): How page images are rendered and encoded. Defaults to 500px JPEG.
+            metrics (Optional[RunMetrics]): Receives the render time of every page.
+        """
+        self.workers = max(1, workers)
+        self.classifier = classifier or PageClassifier()
+        self.encoding = encoding or ImageEncoding()
+        self.metrics = metrics or RunMetrics()
+        self.image_stats = ImageStats()
+        self._stats_lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def close(self):
+        """Stop the render processes; they are started again if more pages are rendered."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    def _render_pool(self) -> ProcessPoolExecutor:
+        """Return the process pool shared by every page stream, starting it on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                # Forking a process that runs threads (requests, watchers) can deadlock the child
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(method))
+            return self._executor
 
     def process_pdf(self, pdf_path: str, text_only: bool = False) -> List[PageContent]:
-        doc = fitz.open(pdf_path)
-        pages_content = []
+        return list(self.iter_pages(pdf_path, text_only))
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            images = page.get_images()
-
-            if images and not text_only:
-                # Page contains images
-                # Get original page size
-                rect = page.rect
-                width, height = rect.width, rect.height
-
-                # Determine the scaling factor
-                if width < height:
-                    scale = 500 / width
-                else:
-                    scale = 500 / height
-
-                # Create a transformation matrix for scaling
-                mat = fitz.Matrix(scale, scale)
-
-                # Render the page with the scaling matrix
-                pix = page.get_pixmap(matrix=mat)
-
-                # Convert the pixmap to bytes in PNG format
-                image_data = pix.tobytes(output='jpeg')
-                pages_content.append(PageContent(page_number=page_num, image_data=image_data))
-            else:
-                # No images, extract text
-                text = page.get_text()
-                pages_content.append(PageContent(page_number=page_num, text=text))
-
-        return pages_content
+    def page_count(self, pdf_path: str) -> int:
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+
+    def fingerprint_pages(self, pdf_path: str, text_only: bool = False) -> List[Optional[str]]:
+        """
+        Compute the content fingerprint of every page without rendering it at full size.
+
+        Pages are classified as they would be for a request and fingerprinted like ``iter_pages``
+        does (see ``_fingerprint_page``); only pages sent as images are rendered, at a small size.
+        With several workers, page ranges are fingerprinted on the process pool.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            text_only (bool): If True, fingerprint the pages as they are sent when only text is used.
+
+        Returns:
+            List[Optional[str]]: The fingerprint of each page, by page number; None for pages that
+            cannot be fingerprinted reliably.
+        """
+        if self.workers > 1:
+            return [fingerprint for fingerprints in self._map_page_ranges(pdf_path, 0, None, _fingerprint_page_range,
+                                                                          text_only, self.classifier)
+                    for fingerprint in fingerprints]
+        return _fingerprint_page_range(pdf_path, 0, self.page_count(pdf_path), text_only, self.classifier)
+
+    @staticmethod
+    def _fingerprint_page(page: fitz.Page, text: str, kind: PageKind) -> Optional[str]:
+        """
+        Fingerprint a page from its extracted text and kind.
+
+        A page sent as text is identified by a hash of its whitespace-normalized text alone. Any
+        other page also gets an exact hash of a small grayscale rendering, so the same slide in another
+        deck matches while pages that differ anywhere in their text or layout do not. Pages whose text
+        is empty and, unless sent as text, whose rendering is nearly uniform (blank pages, faint or
+        very dense scans) carry too little content to be told apart and get no fingerprint, so they
+        are never reused or recorded.
+        """
+        text = " ".join(text.split())
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+        if kind == PageKind.TEXT:
+            return text_hash if text else None
+
+        rect = page.rect
+        if rect.is_empty:
+            return None
+        scale = FINGERPRINT_RESOLUTION / min(rect.width, rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+        samples = pix.samples_mv
+        if not text and _entropy(samples) < FINGERPRINT_MIN_ENTROPY:
+            return None
+        image_hash = hashlib.sha256(samples).hexdigest()[:32]
+        return f"{text_hash}-{image_hash}"
+
+    def iter_pages(self, pdf_path: str, text_only: bool = False, start_page: int = 0,
+                   stop_page: Optional[int] = None, fingerprint: bool = False) -> Iterator[PageContent]:
+        """
+        Lazily extract pages from a PDF, rendering each page only when it is requested.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            text_only (bool): If True, extract text only and never render images.
+            start_page (int): Index of the first page to extract.
+            stop_page (Optional[int]): Index after the last page to extract. Defaults to the end of the document.
+            fingerprint (bool): If True, also fingerprint each page from the data already extracted.
+
+        Yields:
+            PageContent: The content of each page, in page order.
+        """
+        for page, seconds in self._iter_extracted_pages(pdf_path, text_only, start_page, stop_page, fingerprint):
+            with self._stats_lock:
+                self.image_stats.add(page)
+            self.metrics.observe("render", seconds)
+            self.metrics.count(pages=1, images=int(bool(page.image_data)))
+            yield page
+
+    def _iter_extracted_pages(self, pdf_path: str, text_only: bool, start_page: int, stop_page: Optional[int],
+                              fingerprint: bool) -> Iterator[Tuple[PageContent, float]]:
+        if self.workers > 1:
+            for pages in self._map_page_ranges(pdf_path, start_page, stop_page, _extract_page_range, text_only,
+                                               self.classifier, self.encoding, fingerprint):
+                yield from pages
+            return
+
+        with fitz.open(pdf_path) as doc:
+            stop_page = len(doc) if stop_page is None else min(stop_page, len(doc))
+            for page_num in range(start_page, stop_page):
+                yield self._timed_extract_page(doc[page_num], page_num, text_only, self.classifier, self.encoding,
+                                               fingerprint)
+
+    def _map_page_ranges(self, pdf_path: str, start_page: int, stop_page: Optional[int],
+                         function: Callable[..., T], *args: Any) -> Iterator[T]:
+        """
+        Call ``function(pdf_path, start, stop, *args)`` for ranges of pages on the render pool and yield
+        the results in page order.
+
+        Only ``2 * workers`` ranges are scheduled ahead of the consumer, so a slow consumer keeps
+        memory bounded instead of letting the pool render the whole document. Streams of PDFs
+        processed at once share the pool, so they never use more than ``workers`` processes together.
+        """
+        page_count = self.page_count(pdf_path)
+        if stop_page is not None:
+            page_count = min(stop_page, page_count)
+        range_size = min(32, max(1, math.ceil((page_count - start_page) / (self.workers * 4))))
+        ranges = iter(range(start_page, page_count, range_size))
+
+        executor = self._render_pool()
+        pending = deque()
+
+        def schedule():
+            while len(pending) < 2 * self.workers:
+                start = next(ranges, None)
+                if start is None:
+                    return
+                pending.append(executor.submit(function, pdf_path, start, min(start + range_size, page_count), *args))
+
+        try:
+            schedule()
+            while pending:
+                result = pending.popleft().result()
+                schedule()
+                yield result
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool for every stream; later pages get a new one
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            # A stream closed early must not leave its ranges queued ahead of other PDFs
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _timed_extract_page(page: fitz.Page, page_num: int, text_only: bool, classifier: PageClassifier,
+                            encoding: ImageEncoding, fingerprint: bool = False) -> Tuple[PageContent, float]:
+        """Extract a page and measure how long extracting and rendering it took."""
+        start = time.perf_counter()
+        content = PDFProcessor._extract_page(page, page_num, text_only, classifier, encoding, fingerprint)
+        return content, time.perf_counter() - start
+
+    @staticmethod
+    def _extract_page(page: fitz.Page, page_num: int, text_only: bool, classifier: PageClassifier,
+                      encoding: ImageEncoding, fingerprint: bool = False) -> PageContent:
+        text = page.get_text()
+        kind, figure_region = (PageKind.TEXT, None) if text_only else classifier.classify(page, text)
+        page_fingerprint = PDFProcessor._fingerprint_page(page, text, kind) if fingerprint else None
+        if kind == PageKind.TEXT:
+            return PageContent(page_number=page_num, text=text, fingerprint=page_fingerprint)
+
+        # Scale the page so that its short side matches the target resolution
+        rect = page.rect
+        scale = encoding.resolution / min(rect.width, rect.height)
+        mat = fitz.Matrix(scale, scale)
+        colorspace = fitz.csGRAY if encoding.grayscale else fitz.csRGB
+
+        if kind == PageKind.IMAGE:
+            # Render the whole page
+            pix = page.get_pixmap(matrix=mat, colorspace=colorspace)
+        else:
+            # Keep the text and render only the figures, at the resolution the full page would have
+            pix = page.get_pixmap(matrix=mat, colorspace=colorspace, clip=figure_region)
+
+        return PageContent(page_number=page_num, text=text if kind == PageKind.TEXT_WITH_FIGURES else None,
+                           image_data=encode_pixmap(pix, encoding), image_width=pix.width,
+                           image_height=pix.height, image_mime_type=encoding.mime_type,
+                           image_detail=encoding.detail, fingerprint=page_fingerprint)
@@ -0,0 +1,189 @@
+# src/services/request_scheduler.py
+
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Mapping, Optional, TypeVar
+
+import openai
+
+from src.services.run_metrics import RunMetrics
+from src.utils.logging import get_logger
+
+T = TypeVar("T")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an OpenAI rate-limit reset header such as ``"6m0s"`` or ``"20ms"`` into seconds.
+
+    Args:
+        value (Optional[str]): Raw header value.
+
+    Returns:
+        Optional[float]: Duration in seconds, or None if the value is missing or malformed.
+    """
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _Budget:
+    """Remaining capacity of one rate-limit dimension (requests or tokens) until it resets."""
+
+    def __init__(self):
+        self.remaining: Optional[int] = None
+        self.reset_at: float = 0.0
+
+    def refresh(self, now: float):
+        if self.remaining is not None and now >= self.reset_at:
+            # The window rolled over; capacity is unknown until the next response tells us
+            self.remaining = None
+
+    def wait_time(self, cost: int, now: float) -> float:
+        if self.remaining is None or self.remaining >= cost:
+            return 0.0
+        return max(0.0, self.reset_at - now)
+
+    def consume(self, cost: int):
+        if self.remaining is not None:
+            self.remaining -= cost
+
+    def update(self, remaining: Optional[int], reset_in: Optional[float], now: float):
+        if remaining is None:
+            return
+        self.remaining = remaining
+        self.reset_at = now + (reset_in if reset_in is not None else 1.0)
+
+
+class RequestScheduler:
+    """
+    Shared pacing and retry layer for OpenAI requests.
+
+    The scheduler tracks the requests-per-minute and tokens-per-minute budgets reported by the
+    ``x-ratelimit-*`` response headers and holds back new requests until the budget allows them,
+    so concurrent workers stay under the limit instead of running into it. Rate-limit and transient
+    server errors are retried with jittered exponential backoff rather than being dropped.
+
+    A single instance is meant to be shared by every service and worker thread talking to the API.
+    """
+
+    def __init__(self, max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 metrics: Optional[RunMetrics] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics or RunMetrics()
+        self.logger = get_logger()
+        self._lock = threading.Lock()
+        self._requests = _Budget()
+        self._tokens = _Budget()
+        self._paused_until = 0.0
+
+    def execute(self, send: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """
+        Send a request once the rate-limit budget allows it, retrying transient failures.
+
+        Args:
+            send (Callable[[], T]): Performs the request and returns a raw API response exposing ``headers``.
+            estimated_tokens (int): Tokens the request is expected to count against the TPM limit.
+
+        Returns:
+            T: The raw response returned by ``send``.
+
+        Raises:
+            openai.APIError: If the request fails with a non-retryable error or retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens)
+            try:
+                response = send()
+            except openai.APIError as e:
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                if headers is not None:
+                    self._update(headers)
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._backoff_delay(attempt, headers)
+                rate_limited = isinstance(e, openai.RateLimitError)
+                if rate_limited:
+                    self._pause(delay)
+                self.metrics.count(retries=1, rate_limited=int(rate_limited))
+                attempt += 1
+                self.logger.warning(f"Request failed ({e.__class__.__name__}); "
+                                    f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self._update(getattr(response, "headers", {}) or {})
+            return response
+
+    @staticmethod
+    def _is_retryable(error: openai.APIError) -> bool:
+        if isinstance(error, openai.RateLimitError):
+            # An exhausted quota will not recover by waiting
+            return getattr(error, "code", None) != "insufficient_quota"
+        if isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code in (408, 409)
+
+    def _backoff_delay(self, attempt: int, headers: Optional[Mapping[str, Any]]) -> float:
+        if headers is not None:
+            retry_after_ms = headers.get("retry-after-ms")
+            if retry_after_ms is not None:
+                try:
+                    return min(self.max_delay, float(retry_after_ms) / 1000)
+                except ValueError:
+                    pass
+            retry_after = parse_reset_duration(headers.get("retry-after"))
+            if retry_after is not None:
+                return min(self.max_delay, retry_after)
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _acquire(self, estimated_tokens: int):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._requests.refresh(now)
+                self._tokens.refresh(now)
+                wait = max(self._paused_until - now,
+                           self._requests.wait_time(1, now),
+                           self._tokens.wait_time(estimated_tokens, now))
+                if wait <= 0:
+                    # Reserve the budget locally so concurrent callers pace against it too
+                    self._requests.consume(1)
+                    self._tokens.consume(estimated_tokens)
+                    return
+            self.logger.debug(f"Rate limit budget exhausted; waiting {wait:.2f}s")
+            time.sleep(wait)
+
+    def _update(self, headers: Mapping[str, Any]):
+        with self._lock:
+            now = time.monotonic()
+            self._requests.update(_parse_int(headers.get("x-ratelimit-remaining-requests")),
+                                  parse_reset_duration(headers.get("x-ratelimit-reset-requests")), now)
+            self._tokens.update(_parse_int(headers.get("x-ratelimit-remaining-tokens")),
+                                parse_reset_duration(headers.get("x-ratelimit-reset-tokens")), now)
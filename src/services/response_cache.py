@@ -0,0 +1,102 @@
+# src/services/response_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.models.card_record import CardRecord
+from src.utils.card_records import dump_cards, parse_cards
+from src.utils.logging import get_logger
+
+
+class ResponseCache(BaseModel):
+    """
+    On-disk, content-addressed cache of validated OpenAI responses.
+
+    Entries are keyed by a hash of everything that determines the model output (model, language,
+    system prompt, response schema and the exact request content), so re-running an unchanged
+    corpus is served entirely from disk. Old entries are evicted by age and total size.
+    """
+
+    cache_dir: Path = Field(Path("./.cache/responses"))
+    max_size_bytes: Optional[int] = Field(1024 * 1024 * 1024, description="Evict oldest entries beyond this size")
+    max_age_seconds: Optional[float] = Field(30 * 24 * 3600, description="Evict entries older than this")
+
+    @staticmethod
+    def make_key(model: str, language: str, system_prompt: str, json_schema: Dict[str, Any],
+                 content: List[Dict[str, Any]]) -> str:
+        """
+        Compute the cache key for a request.
+
+        Args:
+            model (str): Model name.
+            language (str): Language of the study set.
+            system_prompt (str): System prompt text.
+            json_schema (Dict[str, Any]): Response format schema.
+            content (List[Dict[str, Any]]): Signature of the user message content parts.
+
+        Returns:
+            str: Hex digest identifying the request.
+        """
+        payload = json.dumps(
+            {"model": model, "language": language, "prompt": system_prompt, "schema": json_schema,
+             "content": content},
+            sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[CardRecord]]:
+        """Return the cached cards for ``key``, or None on a miss or expired entry."""
+        path = self._path(key)
+        try:
+            if self.max_age_seconds is not None and time.time() - path.stat().st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            cards = parse_cards(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        # Refresh the mtime so size-based eviction drops the least recently used entries first
+        os.utime(path)
+        return cards
+
+    def put(self, key: str, cards: List[CardRecord]):
+        """Store the validated cards of a response under ``key``."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(dump_cards(cards), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Remove expired entries, then the least recently used ones until the size limit holds."""
+        if not self.cache_dir.exists():
+            return
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if self.max_age_seconds is not None and now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        if self.max_size_bytes is None:
+            return
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+        get_logger().debug(f"Response cache size after eviction: {total_size} bytes")
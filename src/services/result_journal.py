@@ -0,0 +1,113 @@
+# src/services/result_journal.py
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.models.card_record import CardRecord
+from src.utils.card_records import card_dicts, cards_from_dicts
+from src.utils.logging import get_logger
+
+
+class ResultJournal:
+    """
+    Append-only JSONL journal of completed chunks, kept next to a progress file.
+
+    Each line records the page range of one chunk together with the study cards generated for it.
+    Lines are flushed to disk as soon as a chunk finishes, so an interrupted run can replay the
+    finished chunks and only request the missing ones.
+
+    The first line identifies the run the journal belongs to: the PDF (path, size and modification
+    time) and the settings its cards were generated with. A journal left behind by another PDF or by
+    other settings is discarded instead of replayed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = get_logger()
+        self._source: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def for_progress_file(cls, progress_file: str) -> "ResultJournal":
+        """Create the journal belonging to ``progress_file`` (``progress.json`` -> ``progress.journal.jsonl``)."""
+        return cls(f"{os.path.splitext(progress_file)[0]}.journal.jsonl")
+
+    @staticmethod
+    def describe_source(pdf_path: str, settings: str) -> Dict[str, Any]:
+        """
+        Identify the run a journal belongs to.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            settings (str): Digest of the settings the cards are generated with.
+
+        Returns:
+            Dict[str, Any]: The PDF's absolute path, size and modification time, and the settings.
+        """
+        stat = os.stat(pdf_path)
+        return {"path": os.path.abspath(pdf_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "settings": settings}
+
+    def load(self, source: Dict[str, Any]) -> Dict[int, Tuple[int, List[CardRecord]]]:
+        """
+        Load every completed chunk from the journal, if it belongs to ``source``.
+
+        A journal of another source is removed, and later appends start a new one for ``source``.
+
+        Args:
+            source (Dict[str, Any]): Identity of the current run, from ``describe_source``.
+
+        Returns:
+            Dict[int, Tuple[int, List[CardRecord]]]: Maps each chunk's first page to its end page and cards.
+        """
+        self._source = source
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        if self._recorded_source() != source:
+            self.logger.warning(f"Discarding {self.path}: it was written for another PDF or with other settings")
+            self.clear()
+            return completed
+
+        with open(self.path, 'r', encoding='utf-8') as file:
+            next(file)
+            for line_number, line in enumerate(file, start=2):
+                try:
+                    entry = json.loads(line)
+                    cards = cards_from_dicts(entry["study_cards"])
+                    completed[entry["start"]] = (entry["stop"], cards)
+                except (ValueError, KeyError, TypeError):
+                    # A crash mid-write leaves a truncated last line; that chunk is simply redone
+                    self.logger.warning(f"Ignoring unreadable journal entry on line {line_number} of {self.path}")
+        return completed
+
+    def _recorded_source(self) -> Optional[Dict[str, Any]]:
+        """Return the source recorded in the journal's first line, or None if it has none."""
+        with open(self.path, 'r', encoding='utf-8') as file:
+            try:
+                header = json.loads(file.readline())
+            except ValueError:
+                return None
+        return header.get("source") if isinstance(header, dict) else None
+
+    def append(self, start: int, stop: int, study_cards: List[CardRecord]):
+        """
+        Durably record a completed chunk.
+
+        Args:
+            start (int): First page of the chunk.
+            stop (int): Page after the last page of the chunk.
+            study_cards (List[CardRecord]): Cards generated for the chunk.
+        """
+        entry = {"start": start, "stop": stop, "study_cards": card_dicts(study_cards)}
+        with open(self.path, 'a', encoding='utf-8') as file:
+            if file.tell() == 0:
+                file.write(json.dumps({"source": self._source}) + '\n')
+            file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self):
+        """Remove the journal file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,119 @@
+# src/services/run_manifest.py
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from pydantic import ValidationError
+
+from src.models.manifest_entry import ManifestEntry
+from src.utils.logging import get_logger
+
+# Read size when hashing PDFs
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class RunManifest:
+    """
+    JSON manifest of a directory run, kept in the output directory.
+
+    For every input PDF the manifest records its size, modification time and content hash together
+    with the settings its study set was generated with and the directory it was found in. A later run
+    over the same directory only processes PDFs that are new or whose content or settings changed, and
+    can tell which PDFs were removed since; entries of other input directories sharing the output
+    directory are left alone. A PDF whose size and modification time are unchanged is not read again; one that
+    was only touched is hashed and still counts as unchanged.
+    """
+
+    FILE_NAME = "manifest.json"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = get_logger()
+        self.entries: Dict[str, ManifestEntry] = {}
+        # PDFs of a run finish on several threads
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    for entry in json.load(file).get("entries", []):
+                        entry = ManifestEntry.model_validate(entry)
+                        self.entries[entry.source] = entry
+            except (ValueError, ValidationError) as e:
+                self.logger.warning(f"Ignoring unreadable manifest {path}; every PDF will be processed: {e}")
+                self.entries = {}
+
+    @classmethod
+    def for_output_dir(cls, out_dir: str) -> "RunManifest":
+        """Create the manifest kept in ``out_dir``."""
+        return cls(os.path.join(out_dir, cls.FILE_NAME))
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Return the SHA-256 hex digest of a file's content."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def snapshot(self, pdf_path: str, output_csv: str, settings: Dict[str, Any]) -> Tuple[ManifestEntry, bool]:
+        """
+        Describe a PDF as it is now and compare it with its recorded entry.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            output_csv (str): Path of the study set generated for it.
+            settings (Dict[str, Any]): Model, language, text-only mode and prompt and schema digests of the run.
+
+        Returns:
+            Tuple[ManifestEntry, bool]: The current entry of the PDF, and whether its study set is up to
+            date, i.e. it was recorded with the same content and settings and still exists.
+        """
+        source = os.path.basename(pdf_path)
+        input_dir = os.path.dirname(os.path.abspath(pdf_path))
+        stat = os.stat(pdf_path)
+        recorded = self.entries.get(source)
+        if (recorded is not None and recorded.input_dir in (None, input_dir)
+                and (recorded.size, recorded.mtime_ns) == (stat.st_size, stat.st_mtime_ns)):
+            sha256 = recorded.sha256
+        else:
+            sha256 = self.hash_file(pdf_path)
+        entry = ManifestEntry(source=source, input_dir=input_dir, output=output_csv, size=stat.st_size,
+                              mtime_ns=stat.st_mtime_ns, sha256=sha256, **settings)
+        return entry, recorded is not None and recorded.matches(entry) and os.path.exists(output_csv)
+
+    def deleted(self, input_dir: str, pdf_paths: Iterable[str]) -> List[ManifestEntry]:
+        """
+        Return the recorded entries of PDFs of ``input_dir`` that are no longer among ``pdf_paths``.
+
+        Entries recorded for another input directory, or without one, are never returned.
+        """
+        input_dir = os.path.abspath(input_dir)
+        present = {os.path.basename(pdf_path) for pdf_path in pdf_paths}
+        return [entry for source, entry in self.entries.items()
+                if entry.input_dir == input_dir and source not in present]
+
+    def record(self, *entries: ManifestEntry):
+        """Record the entries of PDFs whose study sets were written, and save the manifest."""
+        with self._lock:
+            for entry in entries:
+                self.entries[entry.source] = entry
+            self._save()
+
+    def remove(self, *sources: str):
+        """Forget the entries of the given PDF file names, and save the manifest."""
+        with self._lock:
+            for source in sources:
+                self.entries.pop(source, None)
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"entries": [entry.model_dump() for entry in sorted(self.entries.values(),
+                                                                          key=lambda entry: entry.source)]},
+                      file, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,225 @@
+# src/services/run_metrics.py
+
+import math
+import os
+import threading
+import time
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.models.document_report import DocumentReport
+from src.models.run_report import RunReport
+from src.models.stage_report import StageReport
+
+# Standard prices in USD per million input and output tokens, matched by model name prefix
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+# The Batch API bills half the standard price
+BATCH_PRICE_FACTOR = 0.5
+
+# Counters kept for the whole run and for each PDF
+_COUNTERS = ("pages", "images", "requests", "retries", "rate_limited", "prompt_tokens", "completion_tokens",
+             "base64_bytes", "cards")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class RunMetrics:
+    """
+    Thread-safe collector of the time, tokens and money a run spends in each stage.
+
+    Components report into it through small hooks: ``time`` measures a stage (render, prepare,
+    request, parse, write), ``count`` adds to counters such as pages, base64 bytes or retries,
+    and ``record_usage`` adds the token usage of an API response. Everything reported while a
+    thread is inside ``document`` is also attributed to that PDF. The totals are summarized by
+    ``report`` as a JSON run report and by ``to_openmetrics`` in the Prometheus/OpenMetrics text
+    format, so dashboards can track tokens per page, cost per PDF and throughput.
+    """
+
+    def __init__(self, model: Optional[str] = None, input_price: Optional[float] = None,
+                 output_price: Optional[float] = None, price_factor: float = 1.0):
+        """
+        Args:
+            model (Optional[str]): Model used; selects the default prices.
+            input_price (Optional[float]): USD per million input tokens; overrides the model's default.
+            output_price (Optional[float]): USD per million output tokens; overrides the model's default.
+            price_factor (float): Factor applied to the prices, e.g. ``BATCH_PRICE_FACTOR`` for batch runs.
+        """
+        self.model = model
+        default_prices = next((prices for prefix, prices in sorted(MODEL_PRICES.items(), key=lambda item: -len(item[0]))
+                               if model and model.startswith(prefix)), (None, None))
+        self.input_price = input_price if input_price is not None else default_prices[0]
+        self.output_price = output_price if output_price is not None else default_prices[1]
+        self.price_factor = price_factor
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        # Serializes writes of the report files, which share one temporary file per path
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._stages: Dict[str, array] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._documents: Dict[str, Dict[str, int]] = {}
+        self._windows: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def document(self, pdf_path: str) -> Iterator[None]:
+        """Attribute everything the current thread reports inside the block to ``pdf_path``."""
+        previous = getattr(self._local, "document", None)
+        self._local.document = pdf_path
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.document = previous
+            end = time.perf_counter()
+            with self._lock:
+                self._documents.setdefault(pdf_path, defaultdict(int))
+                window = self._windows.setdefault(pdf_path, [start, end])
+                window[0], window[1] = min(window[0], start), max(window[1], end)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the block as one operation of ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        """Record one operation of ``stage`` that took ``seconds``, e.g. measured in another process."""
+        with self._lock:
+            self._stages.setdefault(stage, array('d')).append(seconds)
+
+    def count(self, **values: int):
+        """Add to the named counters of the run and of the current PDF, e.g. ``count(pages=1)``."""
+        document = getattr(self._local, "document", None)
+        with self._lock:
+            for name, value in values.items():
+                self._counters[name] += value
+                if document is not None:
+                    self._documents.setdefault(document, defaultdict(int))[name] += value
+
+    def record_usage(self, usage: Any):
+        """Count the tokens of an API response's ``usage``, given as an object or a dictionary."""
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda name: getattr(usage, name, None)
+        self.count(prompt_tokens=get("prompt_tokens") or 0, completion_tokens=get("completion_tokens") or 0)
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Estimate the cost of the given tokens in USD, or None if the prices are unknown."""
+        if self.input_price is None or self.output_price is None:
+            return None
+        return round((prompt_tokens * self.input_price + completion_tokens * self.output_price)
+                     * self.price_factor / 1_000_000, 6)
+
+    def report(self) -> RunReport:
+        """Summarize everything recorded so far."""
+        with self._lock:
+            seconds = time.perf_counter() - self._start
+            counters = dict(self._counters)
+            stages = {stage: self._stage_report(samples) for stage, samples in self._stages.items()}
+            documents = [self._document_report(pdf, dict(values)) for pdf, values in self._documents.items()]
+        totals = {name: counters.get(name, 0) for name in _COUNTERS}
+        return RunReport(
+            started_at=self.started_at.isoformat(), seconds=round(seconds, 3), model=self.model,
+            pages_per_second=round(totals["pages"] / seconds, 3) if seconds else 0.0,
+            cards_per_second=round(totals["cards"] / seconds, 3) if seconds else 0.0,
+            cost_usd=self.cost(totals["prompt_tokens"], totals["completion_tokens"]),
+            stages=stages, documents=documents,
+            **{name: value for name, value in totals.items() if name != "images"}
+        )
+
+    def _document_report(self, pdf: str, values: Dict[str, int]) -> DocumentReport:
+        window = self._windows.get(pdf)
+        totals = {name: values.get(name, 0) for name in _COUNTERS if name not in ("rate_limited", "base64_bytes")}
+        tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        return DocumentReport(
+            pdf=pdf, seconds=round(window[1] - window[0], 3) if window else 0.0,
+            tokens_per_page=round(tokens / totals["pages"], 1) if totals["pages"] and tokens else None,
+            cost_usd=self.cost(totals["prompt_tokens"], totals["completion_tokens"]),
+            **totals
+        )
+
+    @staticmethod
+    def _stage_report(samples: array) -> StageReport:
+        if not samples:
+            return StageReport()
+        ordered = sorted(samples)
+
+        def percentile(fraction: float) -> float:
+            return round(ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))] * 1000, 3)
+
+        return StageReport(count=len(ordered), total_seconds=round(sum(ordered), 6),
+                           mean_ms=round(sum(ordered) / len(ordered) * 1000, 3), p50_ms=percentile(0.5),
+                           p99_ms=percentile(0.99), max_ms=round(ordered[-1] * 1000, 3))
+
+    def to_openmetrics(self, prefix: str = "study_set") -> str:
+        """Render the run report in the OpenMetrics text format, which Prometheus also accepts."""
+        report = self.report()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, Dict[str, str], float]]):
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+                lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name}{suffix} {value}")
+
+        metric("run_seconds", "gauge", "Wall time of the run.", [("", {}, report.seconds)])
+        for name in ("pages", "cards", "requests", "retries", "rate_limited", "prompt_tokens", "completion_tokens",
+                     "base64_bytes"):
+            metric(name, "counter", f"{name.replace('_', ' ').capitalize()} of the run.",
+                   [("_total", {}, getattr(report, name))])
+        if report.cost_usd is not None:
+            metric("cost_usd", "gauge", "Estimated cost of the run in USD.", [("", {}, report.cost_usd)])
+
+        stage_samples = []
+        for stage, stats in sorted(report.stages.items()):
+            labels = {"stage": stage}
+            stage_samples += [("", {**labels, "quantile": "0.5"}, round((stats.p50_ms or 0) / 1000, 6)),
+                              ("", {**labels, "quantile": "0.99"}, round((stats.p99_ms or 0) / 1000, 6)),
+                              ("_sum", labels, stats.total_seconds), ("_count", labels, stats.count)]
+        metric("stage_seconds", "summary", "Duration of the operations of each pipeline stage.", stage_samples)
+
+        for name in ("pages", "requests", "prompt_tokens", "completion_tokens", "cards"):
+            metric(f"document_{name}", "counter", f"{name.replace('_', ' ').capitalize()} of each PDF.",
+                   [("_total", {"pdf": document.pdf}, getattr(document, name)) for document in report.documents])
+        if self.input_price is not None and self.output_price is not None:
+            metric("document_cost_usd", "gauge", "Estimated cost of each PDF in USD.",
+                   [("", {"pdf": document.pdf}, document.cost_usd or 0.0) for document in report.documents])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, report_path: Optional[str] = None, metrics_path: Optional[str] = None):
+        """
+        Write the JSON run report and/or the OpenMetrics text file, replacing earlier versions atomically.
+
+        Safe to call from several threads at once; writes are serialized.
+        """
+        for path, content in ((report_path, lambda: self.report().model_dump_json(indent=2)),
+                              (metrics_path, self.to_openmetrics)):
+            if not path:
+                continue
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            # Rendering inside the lock also keeps an older snapshot from replacing a newer one
+            with self._write_lock:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    file.write(content())
+                os.replace(tmp_path, path)
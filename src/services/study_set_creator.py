@@ -2,25 +2,58 @@
 
 import csv
 import os
-from typing import List, Optional
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from pydantic import BaseModel
 
-from src.models import OpenAIResponse
+from src.models.batch_shard import BatchShard
+from src.models.batch_task import BatchTask
+from src.models.card_record import CardRecord
+from src.models.image_encoding import ImageEncoding
+from src.models.manifest_entry import ManifestEntry
 from src.models.page_content import PageContent
+from src.models.request_plan import RequestPlan
+from src.services.card_deduplicator import CardDeduplicator
+from src.services.folder_watcher import FolderWatcher
 from src.services.openai_base_service import OpenAIBaseService
 from src.services.openai_batch_service import OpenAIBatchService
 from src.services.openai_direct_service import OpenAIDirectService
+from src.services.page_index import PageIndex
+from src.services.page_classifier import PageClassifier
 from src.services.pdf_processor import PDFProcessor
 from src.services.prompt_service import PromptService
+from src.services.request_scheduler import RequestScheduler
+from src.services.result_journal import ResultJournal
+from src.services.response_cache import ResponseCache
+from src.services.run_manifest import RunManifest
+from src.services.run_metrics import BATCH_PRICE_FACTOR, RunMetrics
 from src.services.schema_service import SchemaService
+from src.services.template_service import TemplateService
+from src.utils.concurrency import TurnOrder, bounded_map
 from src.utils.logging import get_logger
 from src.utils.progress import get_progress_bar
 
 
 class Progress(BaseModel):
-    progress: int = 0
-    batch_job_id: str | None = None
+    # Batch API state: one entry per submitted shard, the task -> output CSV mapping, the tasks
+    # served from the response cache, the cache key of every submitted task and the outputs already written
+    shards: List[BatchShard] = []
+    pdf_mapping: Dict[str, str] = {}
+    cached_tasks: Dict[str, str] = {}
+    task_cache_keys: Dict[str, str] = {}
+    written_outputs: List[str] = []
+    # Page index state: tasks reused from recorded chunks, and the page fingerprints of every planned
+    # task so its cards can be recorded once they arrive
+    page_index_namespace: Optional[str] = None
+    reused_tasks: Dict[str, int] = {}
+    task_fingerprints: Dict[str, List[Optional[str]]] = {}
+    # Manifest entries to record once the output CSV they belong to is written
+    manifest_entries: Dict[str, ManifestEntry] = {}
+    # PDF of each output CSV, so the work of collecting results is attributed to it in the run report
+    source_pdfs: Dict[str, str] = {}
 
 
 class StudySetCreator:
@@ -36,9 +69,43 @@ class StudySetCreator:
             chunk_size: int = 10,
             use_batch: bool = False,
             language: str = "english",
-            no_resume: bool = False
+            no_resume: bool = False,
+            concurrency: int = 1,
+            max_retries: int = 6,
+            cache_dir: Optional[str] = "./.cache/responses",
+            cache_max_size_mb: Optional[float] = 1024,
+            cache_max_age_days: Optional[float] = 30,
+            render_workers: int = 1,
+            wait_for_batch: bool = True,
+            min_figure_coverage: float = 0.05,
+            full_page_coverage: float = 0.5,
+            image_encoding: Optional[ImageEncoding] = None,
+            max_input_tokens: Optional[int] = 16000,
+            max_output_tokens: int = 4095,
+            context_window: int = 128_000,
+            dedup: str = "none",
+            dedup_threshold: float = 0.8,
+            page_index_path: Optional[str] = "./.cache/page_index.sqlite",
+            file_concurrency: Optional[int] = None,
+            manifest_path: Optional[str] = None,
+            prune: bool = False,
+            base_url: Optional[str] = None,
+            report_path: Optional[str] = None,
+            metrics_path: Optional[str] = None,
+            input_price: Optional[float] = None,
+            output_price: Optional[float] = None
     ):
-        self.pdf_processor = PDFProcessor()
+        # Timing, token and cost metrics of the run, written to report_path and metrics_path
+        self.metrics = RunMetrics(model=model, input_price=input_price, output_price=output_price,
+                                  price_factor=BATCH_PRICE_FACTOR if use_batch else 1.0)
+        self.report_path = report_path
+        self.metrics_path = metrics_path
+        self.pdf_processor = PDFProcessor(
+            workers=render_workers,
+            classifier=PageClassifier(min_figure_coverage=min_figure_coverage, full_page_coverage=full_page_coverage),
+            encoding=image_encoding,
+            metrics=self.metrics
+        )
         self.output_csv = output_csv
         self.logger = get_logger()
         self.chunk_size = chunk_size
@@ -46,14 +113,46 @@ class StudySetCreator:
         self.progress_file = 'progress.json'
         self.language = language
         self.no_resume = no_resume
+        self.concurrency = max(1, concurrency)
+        # Directory runs process this many PDFs at once; all of them share `concurrency` request slots
+        self.file_concurrency = max(1, file_concurrency or self.concurrency)
+        self._request_slots = threading.BoundedSemaphore(self.concurrency)
+        # Guards run-wide state shared by PDFs processed at once: the request plan and the deduplicator
+        self._lock = threading.Lock()
+        self.wait_for_batch = wait_for_batch
         self.prompt_service = PromptService()
         self.schema_service = SchemaService()
-
+        self.template_service = TemplateService(prompt_service=self.prompt_service, schema_service=self.schema_service)
+        self.scheduler = RequestScheduler(max_retries=max_retries, metrics=self.metrics)
+        self.request_plan = RequestPlan()
+        # "run" keeps one index for every output of the run, "file" starts a new one per output
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.deduplicator = CardDeduplicator(threshold=dedup_threshold) if dedup == "run" else None
+        # With run-wide deduplication, outputs of PDFs processed at once are written in input order, so the
+        # card kept of two duplicates does not depend on which PDF finishes first
+        self._write_order: Dict[str, int] = {}
+        self._write_turns: Optional[TurnOrder] = None
+        self.page_index = PageIndex(page_index_path) if page_index_path else None
+        self.manifest = RunManifest(manifest_path) if manifest_path else None
+        # Study sets of PDFs removed from the input directory are only deleted when asked to
+        self.prune = prune
+        self.response_cache = None
+        if cache_dir:
+            self.response_cache = ResponseCache(
+                cache_dir=cache_dir,
+                max_size_bytes=int(cache_max_size_mb * 1024 * 1024) if cache_max_size_mb is not None else None,
+                max_age_seconds=cache_max_age_days * 24 * 3600 if cache_max_age_days is not None else None
+            )
+            self.response_cache.evict()
+
+        service_options = dict(api_key=api_key, model=model, base_url=base_url, prompt_service=self.prompt_service,
+                               schema_service=self.schema_service, template_service=self.template_service,
+                               scheduler=self.scheduler,
+                               response_cache=self.response_cache, metrics=self.metrics, max_input_tokens=max_input_tokens,
+                               max_output_tokens=max_output_tokens, context_window=context_window)
         self.api_service: OpenAIBaseService = (
-            OpenAIBatchService(api_key=api_key, model=model, prompt_service=self.prompt_service,
-                               schema_service=self.schema_service) if use_batch
-            else OpenAIDirectService(api_key=api_key, model=model, prompt_service=self.prompt_service,
-                                     schema_service=self.schema_service)
+            OpenAIBatchService(**service_options) if use_batch else OpenAIDirectService(**service_options)
         )
 
     def to_study_set(self, pdf_path: str, text_only: bool = False):
@@ -65,151 +164,788 @@ class StudySetCreator:
             text_only (bool): If True, process only text content from the PDF.
         """
         self.logger.info(f"Processing PDF: {pdf_path}")
-        pages_content = self.pdf_processor.process_pdf(pdf_path, text_only)
 
-        if self.use_batch:
-            self._process_with_batch_api(pages_content, pdf_path)
-        else:
-            self._process_with_openai_api(pages_content)
+        with self.metrics.document(pdf_path):
+            if self.use_batch:
+                self._process_with_batch_api(pdf_path, text_only)
+            else:
+                self._process_with_openai_api(pdf_path, text_only)
+        self._finish_run()
 
     # src/services/study_set_creator.py
 
-    def process_multiple_pdfs(self, pdf_paths: List[str], output_paths: List[str], text_only: bool = False):
+    def process_multiple_pdfs(self, pdf_paths: List[str], output_paths: List[str], text_only: bool = False,
+                              input_dir: Optional[str] = None):
         """
         Process multiple PDF files and create study sets.
 
+        With a manifest, only PDFs that are new or changed since their study set was recorded are
+        processed. PDFs of ``input_dir`` that were removed since are reported, and their study sets
+        deleted if the creator prunes.
+
         Args:
             pdf_paths (List[str]): List of PDF file paths.
             output_paths (List[str]): Corresponding list of output CSV file paths.
             text_only (bool): If True, process only text content from the PDFs.
+            input_dir (Optional[str]): Directory listed for ``pdf_paths``; without it, removed PDFs are not detected.
         """
         if self.use_batch:
-            # Collect all pages from all PDFs
-            all_pages = []
-            pdf_mapping = {}  # Maps custom_id to output_csv
-
-            for pdf_path, output_csv in zip(pdf_paths, output_paths):
-                self.logger.info(f"Processing PDF for batch: {pdf_path}")
-                pages_content = self.pdf_processor.process_pdf(pdf_path, text_only)
-                for page_num, page_content in enumerate(pages_content):
-                    all_pages.append(page_content)
-                    custom_id = f"{os.path.splitext(os.path.basename(pdf_path))[0]}_page_{page_num}"
-                    pdf_mapping[custom_id] = output_csv
-
-            # Create a single batch job with mapping
-            batch_job_id = self.api_service.create_batch_job(all_pages, self.chunk_size, self.language, pdf_mapping)
-            self._save_progress(Progress(batch_job_id=batch_job_id))
-
-            # Retrieve and process batch results
-            batch_results = self.api_service.retrieve_batch_results(batch_job_id)
-            if batch_results:
-                self.api_service.parse_batch_results_with_mapping(batch_results, pdf_mapping)
-                self._clear_progress()
+            progress = self._load_progress()
+            if progress.pdf_mapping:
+                self.logger.info(f"Resuming {len(progress.shards)} batch jobs")
             else:
-                self.logger.error("Batch processing failed or is still in progress.")
+                pdf_paths, output_paths, manifest_entries = self._select_changed_pdfs(pdf_paths, output_paths,
+                                                                                      text_only, input_dir)
+                if not pdf_paths:
+                    return
+                progress = Progress(page_index_namespace=self._page_index_namespace(text_only),
+                                    manifest_entries=manifest_entries)
+
+                def iter_all_tasks() -> Iterator[BatchTask]:
+                    # Stream the tasks of all PDFs into the batch files; tasks never span two PDFs
+                    for pdf_path, output_csv in zip(pdf_paths, output_paths):
+                        self.logger.info(f"Processing PDF for batch: {pdf_path}")
+                        id_prefix = os.path.splitext(os.path.basename(pdf_path))[0]
+                        with self.metrics.document(pdf_path):
+                            yield from self._iter_batch_tasks(pdf_path, output_csv, text_only, id_prefix, progress)
+
+                self._submit_batch_jobs(iter_all_tasks(), progress)
+
+            self._collect_batch_results(progress)
+            self._finish_run()
         else:
-            # Process each PDF individually
-            # ...
+            pdf_paths, output_paths, manifest_entries = self._select_changed_pdfs(pdf_paths, output_paths, text_only,
+                                                                                  input_dir)
+            if not pdf_paths:
+                return
+
+            # Process several PDFs at once, each with its own output and progress file; the request
+            # slots and rate-limit budget are shared, so small PDFs still keep the API busy
+            if self.deduplicator:
+                self._write_order = {output_csv: index for index, output_csv in enumerate(output_paths)}
+                self._write_turns = TurnOrder()
+
+            def process_pdf(paths: Tuple[str, str]):
+                pdf_path, output_csv = paths
+                try:
+                    self._process_directory_pdf(pdf_path, output_csv, text_only, manifest_entries.get(output_csv))
+                finally:
+                    if self._write_turns:
+                        # A PDF that failed before writing must not hold up the outputs after it
+                        self._write_turns.finish(self._write_order[output_csv])
 
-            # Process each PDF individually
-            for pdf_path, output_csv in zip(pdf_paths, output_paths):
-                self.output_csv = output_csv
-                self.progress_file = f'progress_{os.path.splitext(os.path.basename(pdf_path))[0]}.json'
-                self.to_study_set(pdf_path, text_only)
+            try:
+                for (pdf_path, _), future in bounded_map(process_pdf, zip(pdf_paths, output_paths),
+                                                         self.file_concurrency):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error processing {pdf_path}: {e}")
+            finally:
+                self._write_order, self._write_turns = {}, None
+            self._finish_run()
+
+    def watch_directory(self, in_dir: str, out_dir: str, text_only: bool = False,
+                        watcher: Optional[FolderWatcher] = None, stop: Optional[threading.Event] = None):
+        """
+        Keep processing the PDFs of a directory as they are added or changed, until stopped.
+
+        A watcher reports every PDF once its upload has settled and puts it on a work queue, from which
+        ``file_concurrency`` workers process PDFs at once with this creator, so a burst of uploads is
+        handled in parallel by one warm client sharing the request slots. With a manifest, PDFs whose
+        study set is up to date are skipped, which also makes restarting the watcher cheap, and removed
+        PDFs are reported, or have their study sets deleted if the creator prunes. Run-wide deduplication
+        has no end of run to refer to while watching, so it is applied per study set.
 
-    def _process_with_openai_api(self, pages_content: List[PageContent]):
+        Args:
+            in_dir (str): Directory to watch.
+            out_dir (str): Directory of the output CSV files.
+            text_only (bool): If True, process only text content from the PDFs.
+            watcher (Optional[FolderWatcher]): Watcher of ``in_dir``; a default one is created if omitted.
+            stop (Optional[threading.Event]): Event that stops watching; otherwise runs until interrupted.
+        """
+        if self.use_batch:
+            raise ValueError("Watching a directory requires the direct API")
+        watcher = watcher or FolderWatcher(in_dir)
+        stop = stop or threading.Event()
+        if self.dedup == "run":
+            self.dedup, self.deduplicator = "file", None
+        work: "queue.Queue[Optional[str]]" = queue.Queue()
+        # Outputs whose PDF is queued or being processed. A PDF that becomes ready again while it is being
+        # processed is queued once that run is over, so two workers never share its progress file and output.
+        queued: Set[str] = set()
+        running: Set[str] = set()
+        changed_while_running: Dict[str, str] = {}
+        schedule_lock = threading.Lock()
+
+        def output_of(pdf_path: str) -> str:
+            return os.path.join(out_dir, os.path.splitext(os.path.basename(pdf_path))[0] + '.csv')
+
+        def schedule(pdf_path: str):
+            output_csv = output_of(pdf_path)
+            with schedule_lock:
+                if output_csv in running:
+                    changed_while_running[output_csv] = pdf_path
+                    return
+                if output_csv in queued:
+                    # The queued run reads the PDF as it is by then
+                    return
+                queued.add(output_csv)
+            work.put(pdf_path)
+
+        def process(pdf_path: str, output_csv: str):
+            try:
+                manifest_entry = None
+                if self.manifest:
+                    manifest_entry, up_to_date = self.manifest.snapshot(pdf_path, output_csv,
+                                                                        self._manifest_settings(text_only))
+                    if up_to_date:
+                        self.logger.info(f"Study set of {pdf_path} is up to date")
+                        return
+                self._process_directory_pdf(pdf_path, output_csv, text_only, manifest_entry)
+                # Keep the run report current and the response cache within its limits while watching
+                self.metrics.write(self.report_path, self.metrics_path)
+                if self.response_cache:
+                    self.response_cache.evict()
+            except Exception as e:
+                self.logger.error(f"Error processing {pdf_path}: {e}")
+
+        def worker():
+            while True:
+                pdf_path = work.get()
+                if pdf_path is None:
+                    return
+                # One failing PDF must never end the worker
+                try:
+                    output_csv = output_of(pdf_path)
+                    with schedule_lock:
+                        queued.discard(output_csv)
+                        running.add(output_csv)
+                    try:
+                        process(pdf_path, output_csv)
+                    finally:
+                        with schedule_lock:
+                            running.discard(output_csv)
+                            changed_again = changed_while_running.pop(output_csv, None)
+                        if changed_again and not stop.is_set():
+                            schedule(changed_again)
+                except Exception as e:
+                    self.logger.error(f"Error processing {pdf_path}: {e}")
+
+        workers = [threading.Thread(target=worker, name=f"watch-worker-{index}", daemon=True)
+                   for index in range(self.file_concurrency)]
+        for thread in workers:
+            thread.start()
+        self.logger.info(f"Watching {in_dir} for PDFs; press Ctrl+C to stop")
+        try:
+            # PDFs removed while nobody was watching
+            self._handle_removed_pdfs(in_dir, self._list_pdfs(in_dir))
+            for ready, removed in watcher.watch(stop):
+                if removed:
+                    self._handle_removed_pdfs(in_dir, self._list_pdfs(in_dir))
+                for pdf_path in ready:
+                    schedule(pdf_path)
+        except KeyboardInterrupt:
+            self.logger.info("Stopping; PDFs still waiting are picked up when watching starts again")
+        finally:
+            # Drop queued PDFs, then let every worker finish the PDF it is processing
+            stop.set()
+            while not work.empty():
+                work.get_nowait()
+            for _ in workers:
+                work.put(None)
+            for thread in workers:
+                thread.join()
+            self._finish_run()
+
+    def plan_study_sets(self, pdf_paths: List[str], text_only: bool = False,
+                        output_paths: Optional[List[str]] = None, input_dir: Optional[str] = None) -> RequestPlan:
         """
-        Process pages content using OpenAI API directly.
+        Plan the requests for the given PDFs without sending anything to the API.
+
+        Pages are rendered and packed exactly as in a real run, skipping pages whose cards can be
+        reused from the page index, so the returned plan shows how many requests a run will send
+        and how many pages each covers.
 
         Args:
-            pages_content (List[PageContent]): List of page contents to process.
+            pdf_paths (List[str]): PDF files to plan.
+            text_only (bool): If True, plan for text content only.
+            output_paths (Optional[List[str]]): Output CSV file of each PDF. With a manifest, PDFs whose
+                study sets are up to date are left out of the plan.
+            input_dir (Optional[str]): Directory listed for ``pdf_paths``, to report PDFs removed from it.
+
+        Returns:
+            RequestPlan: The plan of all PDFs together.
         """
-        self.logger.info("Generating study cards using OpenAI API")
-        all_study_cards = []
-        progress = self._load_progress()
+        if output_paths is not None:
+            pdf_paths, _, _ = self._select_changed_pdfs(pdf_paths, output_paths, text_only, input_dir, dry_run=True)
+        namespace = self._page_index_namespace(text_only)
+        for pdf_path in pdf_paths:
+            plan = RequestPlan()
+            _, reusable = self._find_reusable_chunks(pdf_path, namespace, set(), text_only)
+            claimed = {page for pages, _ in reusable for page in pages}
+            missing_pages = [page for page in range(self.pdf_processor.page_count(pdf_path)) if page not in claimed]
+            with self.metrics.document(pdf_path):
+                for _, pages in self._iter_page_runs(pdf_path, text_only, missing_pages):
+                    for _ in self.api_service.plan_chunks(pages, self.chunk_size, self.language, plan):
+                        pass
+            self.logger.info(f"Plan for {pdf_path}: {plan.describe()}")
+            self.request_plan.merge(plan)
+        self._finish_run()
+        return self.request_plan
+
+    def _finish_run(self):
+        """
+        Log the requests planned, the images rendered and the tokens spent so far, write the run report
+        and stop the render processes.
+        """
+        self.pdf_processor.close()
+        if self.request_plan.requests:
+            self.logger.info(f"Planned {self.request_plan.describe()}")
+        stats = self.pdf_processor.image_stats
+        if stats.images:
+            self.logger.info(f"Rendered {stats.images} images this run: {stats.bytes / (1024 * 1024):.2f} MB, "
+                             f"~{stats.tokens} estimated image tokens "
+                             f"({stats.bytes // stats.images} bytes, ~{stats.tokens // stats.images} tokens per image)")
+        report = self.metrics.report()
+        if report.requests:
+            cost = f", ~${report.cost_usd:.4f}" if report.cost_usd is not None else ""
+            self.logger.info(f"Sent {report.requests} requests ({report.retries} retries): "
+                             f"{report.prompt_tokens} prompt and {report.completion_tokens} completion tokens{cost}")
+        self.metrics.write(self.report_path, self.metrics_path)
+
+    def _process_with_openai_api(self, pdf_path: str, text_only: bool = False, output_csv: Optional[str] = None,
+                                 progress_file: Optional[str] = None) -> bool:
+        """
+        Process a PDF using OpenAI API directly.
+
+        Pages are rendered lazily and packed into chunks of at most ``chunk_size`` pages that fit the
+        request's input token budget, while earlier chunks are in flight, so at most
+        ``concurrency + 1`` chunks are held in memory at once. Every finished chunk is appended to
+        the result journal; on resume, journaled page ranges are replayed from disk and only the
+        missing pages are rendered and sent to the API.
 
-        for i in get_progress_bar(range(progress.progress, len(pages_content), self.chunk_size),
-                                  desc="Processing pages"):
-            chunk = pages_content[i:i + self.chunk_size]
+        All state of the run is local or tied to ``output_csv`` and ``progress_file``, so several PDFs
+        can be processed at once; their requests share the creator's request slots.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            text_only (bool): If True, process only text content from the PDF.
+            output_csv (Optional[str]): Output CSV file. Defaults to ``self.output_csv``.
+            progress_file (Optional[str]): Progress file. Defaults to ``self.progress_file``.
+
+        Returns:
+            bool: True if every chunk succeeded, False if the study set is missing the cards of failed chunks.
+        """
+        self.logger.info("Generating study cards using OpenAI API")
+        progress_file = progress_file or self.progress_file
+        # Honours --no_resume by discarding any previous progress and journal
+        self._load_progress(progress_file)
+        journal = self._journal(progress_file)
+        total_pages = self.pdf_processor.page_count(pdf_path)
+        namespace = self._page_index_namespace(text_only)
+
+        # Replay journaled chunks, skipping any that overlap an earlier one or lie beyond the document
+        results: Dict[int, List[CardRecord]] = {}
+        covered: Set[int] = set()
+        journaled = journal.load(ResultJournal.describe_source(pdf_path, namespace))
+        for start, (stop, cards) in sorted(journaled.items()):
+            if stop <= total_pages and covered.isdisjoint(range(start, stop)):
+                results[start] = cards
+                covered.update(range(start, stop))
+        if results:
+            self.logger.info(f"Replaying {len(results)} completed chunks from {journal.path}")
+
+        fingerprints, reusable = self._find_reusable_chunks(pdf_path, namespace, covered, text_only)
+        for pages, chunk_id in reusable:
+            results[pages[0]] = self.page_index.load_cards(chunk_id)
+            covered.update(pages)
+
+        missing_pages = [page for page in range(total_pages) if page not in covered]
+        plan = RequestPlan()
+        # Without a lookup, the pages are fingerprinted while rendering so their chunks can be recorded
+        chunks = self._iter_chunks(pdf_path, text_only, missing_pages, plan,
+                                   fingerprint=bool(self.page_index) and not fingerprints)
+        failed_chunks = 0
+
+        def process_chunk(indexed_chunk: Tuple[int, List[PageContent]]) -> List[CardRecord]:
+            with self._request_slots, self.metrics.document(pdf_path):
+                return self.api_service.generate_chunk(indexed_chunk[1], language=self.language)
+
+        progress_bar = get_progress_bar(None, total=len(missing_pages), unit="page",
+                                        desc=f"Processing {os.path.basename(pdf_path)}")
+        for (start, chunk), future in bounded_map(process_chunk, chunks, self.concurrency):
+            progress_bar.update(len(chunk))
             try:
-                response = self.api_service.generate_study_cards(chunk, language=self.language)
-                all_study_cards.extend(response.study_cards)
-                self._save_progress(Progress(progress=i + self.chunk_size))
+                results[start] = future.result()
             except Exception as e:
-                self.logger.error(f"Error processing chunk starting at page {i}: {e}")
+                self.logger.error(f"Error processing chunk starting at page {start}: {e}")
+                failed_chunks += 1
+                continue
+            journal.append(start, start + len(chunk), results[start])
+            if self.page_index:
+                self.page_index.record(namespace, self._chunk_fingerprints(chunk, fingerprints), results[start])
+        progress_bar.close()
+        with self._lock:
+            self.request_plan.merge(plan)
+
+        all_study_cards = [card for start in sorted(results) for card in results[start]]
+        self._save_csv(all_study_cards, output_csv)
+        if failed_chunks:
+            self.logger.warning(f"{failed_chunks} chunks of {pdf_path} failed; run again to retry only those chunks")
+            return False
+        self._clear_progress(progress_file)
+        return True
+
+    def _iter_chunks(self, pdf_path: str, text_only: bool, missing_pages: List[int], plan: RequestPlan,
+                     fingerprint: bool = False) -> Iterator[Tuple[int, List[PageContent]]]:
+        """
+        Render the given pages and pack them into chunks, each tagged with its first page.
 
-        self._save_csv(all_study_cards)
-        self._clear_progress()
+        Every run of consecutive pages is rendered from a single page stream and packed on its own,
+        so chunks never span a gap left by journaled or reused chunks.
+        """
+        for _, pages in self._iter_page_runs(pdf_path, text_only, missing_pages, fingerprint):
+            for chunk in self.api_service.plan_chunks(pages, self.chunk_size, self.language, plan):
+                yield chunk[0].page_number, chunk
 
-    def _process_with_batch_api(self, pages_content: List[PageContent], pdf_path: str):
+    def _iter_page_runs(self, pdf_path: str, text_only: bool, page_numbers: List[int],
+                        fingerprint: bool = False) -> Iterator[Tuple[int, Iterator[PageContent]]]:
+        """
+        Yield the first page and a lazy page stream of every run of consecutive ``page_numbers``,
+        whose pages are also fingerprinted if ``fingerprint`` is set.
         """
-        Process pages content using OpenAI Batch API.
+        run_start = 0
+        for index, page in enumerate(page_numbers):
+            if index == 0 or page != page_numbers[index - 1] + 1:
+                run_start = page
+            if index + 1 < len(page_numbers) and page_numbers[index + 1] == page + 1:
+                continue
+            yield run_start, self.pdf_processor.iter_pages(pdf_path, text_only, start_page=run_start,
+                                                           stop_page=page + 1, fingerprint=fingerprint)
+
+    def _process_directory_pdf(self, pdf_path: str, output_csv: str, text_only: bool,
+                               manifest_entry: Optional[ManifestEntry] = None):
+        """Process one PDF of a directory with its own progress file, and record it in the manifest once complete."""
+        self.logger.info(f"Processing PDF: {pdf_path}")
+        progress_file = f'progress_{os.path.splitext(os.path.basename(pdf_path))[0]}.json'
+        with self.metrics.document(pdf_path):
+            complete = self._process_with_openai_api(pdf_path, text_only, output_csv, progress_file)
+        if complete and manifest_entry and self.manifest:
+            self.manifest.record(manifest_entry)
+
+    @staticmethod
+    def _list_pdfs(input_dir: str) -> List[str]:
+        """Return the paths of the PDFs in a directory, or none if it cannot be listed."""
+        try:
+            return [entry.path for entry in os.scandir(input_dir) if entry.name.lower().endswith('.pdf')]
+        except OSError:
+            return []
+
+    def _handle_removed_pdfs(self, input_dir: Optional[str], pdf_paths: List[str], dry_run: bool = False):
+        """
+        Report the PDFs recorded for ``input_dir`` that are no longer among ``pdf_paths``.
+
+        Their study sets are only deleted if the creator prunes, and never when ``pdf_paths`` is empty:
+        an empty listing is more likely an unmounted share or a wrong path than every PDF removed.
+        """
+        if not self.manifest or input_dir is None:
+            return
+        removed = self.manifest.deleted(input_dir, pdf_paths)
+        if not removed:
+            return
+        sources = ", ".join(entry.source for entry in removed)
+        if not self.prune:
+            self.logger.warning(f"{len(removed)} PDFs were removed from {input_dir}: {sources}; "
+                                f"their study sets are kept (use --prune to delete them)")
+        elif not pdf_paths:
+            self.logger.warning(f"{input_dir} holds no PDFs; not deleting the study sets of {len(removed)} "
+                                f"recorded PDFs in case the directory is unavailable")
+        elif dry_run:
+            self.logger.info(f"{len(removed)} PDFs were removed from {input_dir}; their study sets would be "
+                             f"deleted: {', '.join(entry.output for entry in removed)}")
+        else:
+            for entry in removed:
+                self._delete_study_set(entry)
+
+    def _delete_study_set(self, entry: ManifestEntry):
+        """Delete the study set of a removed PDF and forget its manifest entry."""
+        self.logger.info(f"{entry.source} was removed; deleting its study set {entry.output}")
+        if os.path.exists(entry.output):
+            os.remove(entry.output)
+        self.manifest.remove(entry.source)
+
+    def _manifest_settings(self, text_only: bool) -> Dict[str, Any]:
+        """Settings of the current run that are recorded with every manifest entry."""
+        template = self.template_service.get(self.language)
+        return dict(model=self.api_service.model, language=self.language, text_only=text_only,
+                    prompt_sha256=template.prompt_sha256, schema_sha256=template.schema_sha256)
+
+    def _select_changed_pdfs(self, pdf_paths: List[str], output_paths: List[str], text_only: bool,
+                             input_dir: Optional[str] = None,
+                             dry_run: bool = False) -> Tuple[List[str], List[str], Dict[str, ManifestEntry]]:
+        """
+        Compare the PDFs with the manifest and keep those whose study set is missing or out of date.
+
+        PDFs removed from ``input_dir`` since the last run are reported. Unless ``dry_run`` is set,
+        their study sets are deleted if the creator prunes, unchanged PDFs are re-recorded so a new
+        modification time does not make them hashed again, and with run-wide deduplication the cards
+        of the study sets kept are fed to the deduplicator, so new study sets do not repeat them.
+
+        Args:
+            pdf_paths (List[str]): PDF files of the run.
+            output_paths (List[str]): Corresponding output CSV files.
+            text_only (bool): Whether only the text of the PDFs is used.
+            input_dir (Optional[str]): Directory listed for ``pdf_paths``.
+            dry_run (bool): If True, only report what would be done.
+
+        Returns:
+            Tuple[List[str], List[str], Dict[str, ManifestEntry]]: The PDFs to process, their output CSV
+            files, and the manifest entry to record for each output once it is written.
+        """
+        if not self.manifest:
+            return pdf_paths, output_paths, {}
+
+        self._handle_removed_pdfs(input_dir, pdf_paths, dry_run)
+
+        settings = self._manifest_settings(text_only)
+        changed_pdfs, changed_outputs, entries, unchanged = [], [], {}, []
+        for pdf_path, output_csv in zip(pdf_paths, output_paths):
+            entry, up_to_date = self.manifest.snapshot(pdf_path, output_csv, settings)
+            if up_to_date:
+                unchanged.append(entry)
+            else:
+                changed_pdfs.append(pdf_path)
+                changed_outputs.append(output_csv)
+                entries[output_csv] = entry
+
+        self.logger.info(f"{len(changed_pdfs)} of {len(pdf_paths)} PDFs are new or changed; "
+                         f"skipping {len(unchanged)} up-to-date study sets")
+        if not dry_run and unchanged:
+            self.manifest.record(*unchanged)
+            if changed_pdfs and self.deduplicator:
+                for entry in unchanged:
+                    for card in self._load_csv(entry.output):
+                        self.deduplicator.is_duplicate(card)
+        return changed_pdfs, changed_outputs, entries
+
+    def _page_index_namespace(self, text_only: bool) -> str:
+        """Namespace of the page index entries produced with the current settings."""
+        template = self.template_service.get(self.language)
+        return ResponseCache.make_key(self.api_service.model, self.language, template.system_prompt,
+                                      template.json_schema, [{"text_only": text_only}])
+
+    def _find_reusable_chunks(self, pdf_path: str, namespace: str, exclude: Set[int],
+                              text_only: bool) -> Tuple[List[Optional[str]], List[Tuple[List[int], int]]]:
+        """
+        Fingerprint the pages of a PDF and find recorded chunks that can be reused for it.
+
+        Nothing is fingerprinted up front when the page index holds no chunks of ``namespace``, since
+        nothing could be reused; the pages are then fingerprinted while they are rendered.
+
+        Returns:
+            Tuple[List[Optional[str]], List[Tuple[List[int], int]]]: The page fingerprints (empty without
+            a lookup) and the pages and id of every reusable chunk.
+        """
+        if not self.page_index or not self.page_index.has_chunks(namespace):
+            return [], []
+        fingerprints = self.pdf_processor.fingerprint_pages(pdf_path, text_only)
+        reusable = self.page_index.find_reusable(namespace, fingerprints, exclude)
+        if reusable:
+            self.logger.info(f"Reusing the cards of {len(reusable)} earlier chunks for "
+                             f"{sum(len(pages) for pages, _ in reusable)} pages of {pdf_path}")
+        return fingerprints, reusable
+
+    @staticmethod
+    def _chunk_fingerprints(pages: List[PageContent], fingerprints: List[Optional[str]]) -> List[Optional[str]]:
+        """Fingerprints of a chunk's pages: looked up in ``fingerprints`` if given, else computed while rendering."""
+        return [fingerprints[page.page_number] if fingerprints else page.fingerprint for page in pages]
+
+    def _iter_batch_tasks(self, pdf_path: str, output_csv: str, text_only: bool, id_prefix: str,
+                          progress: Progress) -> Iterator[BatchTask]:
+        """
+        Plan the batch tasks of one PDF, mapping each task to ``output_csv`` in page order.
+
+        Chunks reused from the page index are recorded in ``progress`` in place of tasks, and the page
+        fingerprints of every task are kept so its cards can be recorded once they arrive.
+        """
+        total_pages = self.pdf_processor.page_count(pdf_path)
+        progress.source_pdfs[output_csv] = pdf_path
+        fingerprints, reusable = self._find_reusable_chunks(pdf_path, progress.page_index_namespace, set(),
+                                                            text_only)
+        claimed = {page for pages, _ in reusable for page in pages}
+        pending_reuse = list(reversed(reusable))
+
+        def map_reused_before(page_number: int):
+            while pending_reuse and pending_reuse[-1][0][0] < page_number:
+                pages, chunk_id = pending_reuse.pop()
+                custom_id = f"{id_prefix}_reused_pages_{pages[0]}-{pages[-1]}"
+                progress.pdf_mapping[custom_id] = output_csv
+                progress.reused_tasks[custom_id] = chunk_id
+
+        missing_pages = [page for page in range(total_pages) if page not in claimed]
+        for run_start, pages in self._iter_page_runs(pdf_path, text_only, missing_pages,
+                                                     fingerprint=bool(self.page_index) and not fingerprints):
+            map_reused_before(run_start)
+            for task in self.api_service.plan_tasks(pages, self.chunk_size, id_prefix, self.language,
+                                                    self.request_plan):
+                progress.pdf_mapping[task.custom_id] = output_csv
+                if self.page_index:
+                    progress.task_fingerprints[task.custom_id] = self._chunk_fingerprints(task.pages, fingerprints)
+                yield task
+        map_reused_before(total_pages)
+
+    def _process_with_batch_api(self, pdf_path: str, text_only: bool = False):
+        """
+        Process a PDF using OpenAI Batch API.
+
+        Pages are rendered straight into the batch files, and not at all when resuming submitted jobs.
 
         Args:
-            pages_content (List[PageContent]): List of page contents to process.
             pdf_path (str): Path to the PDF file.
+            text_only (bool): If True, process only text content from the PDF.
         """
         self.logger.info("Generating study cards using OpenAI Batch API")
         progress = self._load_progress()
 
-        if progress.batch_job_id:
-            self.logger.info(f"Resuming batch job with ID: {progress.batch_job_id}")
-            batch_result = self.api_service.retrieve_batch_results(progress.batch_job_id)
+        if progress.pdf_mapping:
+            self.logger.info(f"Resuming batch jobs: {', '.join(shard.job_id for shard in progress.shards)}")
         else:
-            batch_job_id = self.api_service.create_batch_job(pages_content, self.chunk_size, self.language)
-            self._save_progress(Progress(batch_job_id=batch_job_id))
-            batch_result = self.api_service.retrieve_batch_results(batch_job_id)
-
-        if batch_result:
-            # Assuming batch_result contains study cards for the PDF
-            all_study_cards = self.api_service.parse_batch_results(batch_result)
-            self._save_csv(all_study_cards.study_cards)
+            progress = Progress(page_index_namespace=self._page_index_namespace(text_only))
+            self._submit_batch_jobs(self._iter_batch_tasks(pdf_path, self.output_csv, text_only, "task", progress),
+                                    progress)
+
+        self._collect_batch_results(progress)
+
+    def _submit_batch_jobs(self, tasks: Iterator[BatchTask], progress: Progress):
+        """
+        Submit the tasks as sharded batch jobs and record the shards in the progress file.
+
+        Every shard is saved as soon as its job is created, so the jobs of a submission that fails or
+        is interrupted halfway are collected by the next run instead of being submitted and billed again.
+
+        Args:
+            tasks (Iterator[BatchTask]): Tasks to submit.
+            progress (Progress): Progress whose task mapping is filled while ``tasks`` is consumed.
+        """
+        def save_shards(shards: List[BatchShard]):
+            progress.shards = shards
+            progress.cached_tasks = self.api_service.cached_task_keys
+            # A resumed run needs these before it parses any result, to put the results in the cache
+            progress.task_cache_keys = self.api_service.task_cache_keys
+            self._save_progress(progress)
+
+        save_shards(self.api_service.create_batch_jobs(tasks, self.language, on_submitted=save_shards))
+
+    def _collect_batch_results(self, progress: Progress):
+        """
+        Wait for the batch shards and write each output CSV as soon as every shard holding its tasks is done.
+
+        Args:
+            progress (Progress): Progress describing the submitted jobs; updated as outputs are written.
+        """
+        if progress.task_cache_keys:
+            self.api_service.restore_task_cache_keys(progress.task_cache_keys)
+        tasks_per_output: Dict[str, List[str]] = {}
+        for custom_id, output_csv in progress.pdf_mapping.items():
+            if output_csv not in progress.written_outputs:
+                tasks_per_output.setdefault(output_csv, []).append(custom_id)
+        if self.deduplicator:
+            # Outputs written before the run was interrupted still count when deduplicating the rest
+            for output_csv in progress.written_outputs:
+                if os.path.exists(output_csv):
+                    for card in self._load_csv(output_csv):
+                        self.deduplicator.is_duplicate(card)
+
+        shard_of_task = {custom_id: shard.job_id for shard in progress.shards for custom_id in shard.custom_ids}
+        pending_shards: Dict[str, Set[str]] = {
+            output_csv: {shard_of_task[custom_id] for custom_id in custom_ids if custom_id in shard_of_task}
+            for output_csv, custom_ids in tasks_per_output.items()
+        }
+
+        # Where each task's result lives: a (file, byte offset) in a downloaded batch output
+        result_locations: Dict[str, Tuple[str, int]] = {}
+        self._write_finished_outputs(progress, tasks_per_output, pending_shards, result_locations)
+
+        job_ids = [shard.job_id for shard in progress.shards
+                   if any(shard.job_id in shards for shards in pending_shards.values())]
+        custom_ids_of_job = {shard.job_id: shard.custom_ids for shard in progress.shards}
+        results_files = []
+        try:
+            for batch_job in self.api_service.poll_batch_jobs(job_ids, wait=self.wait_for_batch):
+                results_file = self.api_service.download_batch_results(batch_job)
+                if results_file:
+                    results_files.append(results_file)
+                    for custom_id, offset in self.api_service.index_batch_results(results_file).items():
+                        result_locations[custom_id] = (results_file, offset)
+                missing = [custom_id for custom_id in custom_ids_of_job[batch_job.id]
+                           if custom_id not in result_locations]
+                if missing:
+                    self.logger.warning(f"{len(missing)} tasks of batch job {batch_job.id} returned no result; "
+                                        f"run again with --no_resume to resubmit only those (the rest is cached)")
+                for shards in pending_shards.values():
+                    shards.discard(batch_job.id)
+                self._write_finished_outputs(progress, tasks_per_output, pending_shards, result_locations)
+        finally:
+            for results_file in results_files:
+                os.remove(results_file)
+
+        if not pending_shards:
             self._clear_progress()
-        else:
+        elif self.wait_for_batch:
             self.logger.error("Batch processing failed or is still in progress.")
+        else:
+            self.logger.info(f"{len(pending_shards)} study sets are waiting on batch jobs still in progress; "
+                             f"run the same command again to collect them")
 
-    def _save_csv(self, study_cards: List[OpenAIResponse]):
+    def _write_finished_outputs(self, progress: Progress, tasks_per_output: Dict[str, List[str]],
+                                pending_shards: Dict[str, Set[str]], result_locations: Dict[str, Tuple[str, int]]):
         """
-        Save study cards to a CSV file.
+        Write every output CSV whose shards are all done, in page order, and record it in the progress file.
 
-        Args:
-            study_cards (List[OpenAIResponse]): List of study cards to save.
+        With run-wide deduplication, outputs are written in input order, so an output also waits for the
+        outputs before it.
+        """
+        finished = []
+        for output_csv, shards in pending_shards.items():
+            if shards and self.deduplicator:
+                break
+            if not shards:
+                finished.append(output_csv)
+        for output_csv in finished:
+            failed_tasks: List[str] = []
+
+            def iter_cards() -> Iterator[CardRecord]:
+                for custom_id in tasks_per_output[output_csv]:
+                    study_cards = self._load_task_cards(custom_id, progress, result_locations)
+                    if study_cards is None:
+                        failed_tasks.append(custom_id)
+                        continue
+                    yield from study_cards
+
+            with self.metrics.document(progress.source_pdfs.get(output_csv, output_csv)):
+                self._save_csv(iter_cards(), output_csv)
+            del pending_shards[output_csv]
+            progress.written_outputs.append(output_csv)
+            self._save_progress(progress)
+            # An output missing the results of some tasks is processed again by the next run
+            if failed_tasks:
+                self.logger.warning(f"{len(failed_tasks)} tasks of {output_csv} returned no valid result; "
+                                    f"its study set is incomplete")
+            elif self.manifest and output_csv in progress.manifest_entries:
+                self.manifest.record(progress.manifest_entries[output_csv])
+
+    def _load_task_cards(self, custom_id: str, progress: Progress,
+                         result_locations: Dict[str, Tuple[str, int]]) -> Optional[List[CardRecord]]:
         """
-        with open(self.output_csv, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['Question', 'Answer']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for card in study_cards:
-                writer.writerow({'Question': card.question, 'Answer': card.answer})
+        Load the cards of one batch task from the page index, the response cache or a downloaded batch output.
 
-        self.logger.info(f"Study set saved to {self.output_csv}")
+        Returns:
+            Optional[List[CardRecord]]: The task's cards, or None if it has no result or its result is invalid.
+        """
+        if custom_id in progress.reused_tasks:
+            return self.page_index.load_cards(progress.reused_tasks[custom_id]) if self.page_index else None
+
+        cache_key = progress.cached_tasks.get(custom_id)
+        if cache_key:
+            study_cards = self.response_cache.get(cache_key) if self.response_cache else None
+            if study_cards is None:
+                self.logger.error(f"Cached result for task {custom_id} is no longer available")
+        elif custom_id in result_locations:
+            results_file, offset = result_locations[custom_id]
+            study_cards = self.api_service.parse_batch_result(
+                self.api_service.read_batch_result(results_file, offset))
+        else:
+            return None
 
-    def _load_progress(self) -> Progress:
+        if study_cards is not None and self.page_index and custom_id in progress.task_fingerprints:
+            self.page_index.record(progress.page_index_namespace, progress.task_fingerprints[custom_id], study_cards)
+        return study_cards
+
+    def _save_csv(self, study_cards: Iterable[CardRecord], output_csv: Optional[str] = None):
+        """
+        Save study cards to a CSV file.
+
+        Args:
+            study_cards (Iterable[CardRecord]): Study cards to save; may be a lazily produced stream.
+            output_csv (Optional[str]): Path to the output CSV file. Defaults to ``self.output_csv``.
+        """
+        output_csv = output_csv or self.output_csv
+        deduplicator = self.deduplicator
+        if self.dedup == "file":
+            deduplicator = CardDeduplicator(threshold=self.dedup_threshold)
+        dropped_before = deduplicator.dropped if deduplicator else 0
+        if deduplicator:
+            study_cards = deduplicator.filter(study_cards)
+
+        # The run-wide deduplicator is shared by PDFs processed at once, so outputs are written one at a time,
+        # in input order where one is set
+        written = 0
+        if deduplicator is None or deduplicator is not self.deduplicator:
+            turn = nullcontext()
+        elif self._write_turns and output_csv in self._write_order:
+            turn = self._write_turns.turn(self._write_order[output_csv])
+        else:
+            turn = self._lock
+        with turn:
+            with self.metrics.time("write"), open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
+                fieldnames = ['Question', 'Answer']
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+                for card in study_cards:
+                    writer.writerow({'Question': card.question, 'Answer': card.answer})
+                    written += 1
+        self.metrics.count(cards=written)
+
+        if deduplicator and deduplicator.dropped > dropped_before:
+            self.logger.info(f"Dropped {deduplicator.dropped - dropped_before} duplicate cards from {output_csv}")
+        self.logger.info(f"Study set saved to {output_csv}")
+
+    def _load_csv(self, output_csv: str) -> Iterator[CardRecord]:
+        """Read the study cards of a CSV file written by ``_save_csv``, skipping incomplete rows."""
+        with open(output_csv, 'r', newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                question, answer = row.get('Question'), row.get('Answer')
+                if question and answer:
+                    yield CardRecord(question, answer)
+
+    def _load_progress(self, progress_file: Optional[str] = None) -> Progress:
         """
         Load progress from the progress file.
 
+        Args:
+            progress_file (Optional[str]): Progress file to use. Defaults to ``self.progress_file``.
+
         Returns:
             Progress: The loaded progress.
         """
+        progress_file = progress_file or self.progress_file
         if self.no_resume:
-            self._clear_progress()
+            self._clear_progress(progress_file)
             return Progress()
-        if os.path.exists(self.progress_file):
-            with open(self.progress_file, 'r') as f:
+        if os.path.exists(progress_file):
+            with open(progress_file, 'r') as f:
                 return Progress.model_validate_json(f.read())
         return Progress()
 
-    def _save_progress(self, progress: Progress):
+    def _save_progress(self, progress: Progress, progress_file: Optional[str] = None):
         """
         Save progress to the progress file.
 
         Args:
             progress (Progress): The progress to save.
+            progress_file (Optional[str]): Progress file to use. Defaults to ``self.progress_file``.
         """
-        with open(self.progress_file, 'w') as f:
+        with open(progress_file or self.progress_file, 'w') as f:
             f.write(progress.model_dump_json())
 
-    def _clear_progress(self):
-        """Remove the progress file."""
-        if os.path.exists(self.progress_file):
-            os.remove(self.progress_file)
+    def _journal(self, progress_file: Optional[str] = None) -> ResultJournal:
+        """Return the result journal belonging to a progress file, by default the current one."""
+        return ResultJournal.for_progress_file(progress_file or self.progress_file)
+
+    def _clear_progress(self, progress_file: Optional[str] = None):
+        """Remove a progress file, by default the current one, and its result journal."""
+        progress_file = progress_file or self.progress_file
+        if os.path.exists(progress_file):
+            os.remove(progress_file)
+        self._journal(progress_file).clear()
@@ -0,0 +1,80 @@
+# src/services/template_service.py
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from pydantic import BaseModel, PrivateAttr
+
+from src.models.message_template import MessageTemplate
+from src.services.prompt_service import PromptService
+from src.services.schema_service import SchemaService
+
+# (size, mtime) of the prompt and schema files a template was built from
+_Signature = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+def _file_signature(path: os.PathLike) -> Tuple[int, int]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # Reported by the prompt or schema service when the template is built
+        return -1, -1
+    return stat.st_size, stat.st_mtime_ns
+
+
+class TemplateService(BaseModel):
+    """
+    Loads the prompt and schema once and serves the static part of every request from memory.
+
+    A template is built per language and reused until the prompt or schema file changes on disk, which
+    is detected from their size and modification time, so edits still take effect without a restart.
+    Templates are safe to share between threads.
+    """
+
+    prompt_service: PromptService
+    schema_service: SchemaService
+
+    _templates: Dict[str, Tuple[_Signature, MessageTemplate]] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def get(self, language: str) -> MessageTemplate:
+        """
+        Return the template of a language, rebuilding it if the prompt or schema file changed.
+
+        Args:
+            language (str): Language of the study set.
+
+        Returns:
+            MessageTemplate: The system message, response format and their hashes.
+
+        Raises:
+            ValueError: If the prompt or schema file does not exist.
+        """
+        signature = (_file_signature(self.prompt_service.prompt_file),
+                     _file_signature(self.schema_service.schema_file))
+        with self._lock:
+            cached: Optional[Tuple[_Signature, MessageTemplate]] = self._templates.get(language)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        template = self._build(language)
+        with self._lock:
+            self._templates[language] = (signature, template)
+        return template
+
+    def _build(self, language: str) -> MessageTemplate:
+        system_prompt = self.prompt_service.load_prompt(language)
+        json_schema = self.schema_service.load_schema()
+        canonical_schema = json.dumps(json_schema, sort_keys=True, separators=(",", ":"))
+        prompt_sha256 = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        schema_sha256 = hashlib.sha256(canonical_schema.encode("utf-8")).hexdigest()
+        return MessageTemplate(
+            language=language,
+            system_prompt=system_prompt,
+            json_schema=json_schema,
+            system_message={"role": "system", "content": system_prompt},
+            prompt_sha256=prompt_sha256,
+            schema_sha256=schema_sha256,
+            sha256=hashlib.sha256(f"{language}\n{prompt_sha256}\n{schema_sha256}".encode("utf-8")).hexdigest()
+        )
@@ -0,0 +1,74 @@
+# src/utils/card_records.py
+
+import json
+from typing import Any, Dict, Iterable, List, Union
+
+from src.models.card_record import CardRecord
+from src.models.openai_response import OpenAIResponse
+from src.models.study_card import StudyCard
+
+# Minimum length of a question or answer without surrounding whitespace, as enforced by StudyCard
+MIN_CARD_TEXT_LENGTH = 3
+
+
+def parse_cards(content: Union[str, bytes]) -> List[CardRecord]:
+    """
+    Parse and validate a response in the ``OpenAIResponse`` JSON format into card records.
+
+    Applies the same rules as ``OpenAIResponse.model_validate_json`` in a single pass over the
+    decoded JSON, without building a model per card. Like the model, one invalid card rejects
+    the whole response.
+
+    Args:
+        content (Union[str, bytes]): JSON text of the response.
+
+    Returns:
+        List[CardRecord]: The cards, in order.
+
+    Raises:
+        ValueError: If the content is not valid JSON or does not match the response schema.
+    """
+    data = json.loads(content)
+    items = data.get("study_cards") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise ValueError("Response has no study_cards list")
+    cards = []
+    for index, item in enumerate(items):
+        question = item.get("question") if isinstance(item, dict) else None
+        answer = item.get("answer") if isinstance(item, dict) else None
+        if not (isinstance(question, str) and isinstance(answer, str)):
+            raise ValueError(f"Study card {index} needs a question and an answer")
+        if len(question.strip()) < MIN_CARD_TEXT_LENGTH or len(answer.strip()) < MIN_CARD_TEXT_LENGTH:
+            raise ValueError(f"Question and answer of study card {index} must be at least "
+                             f"{MIN_CARD_TEXT_LENGTH} characters long (excluding whitespace)")
+        cards.append(CardRecord(question, answer))
+    return cards
+
+
+def dump_cards(cards: Iterable[CardRecord]) -> str:
+    """Serialize card records in the ``OpenAIResponse`` JSON format read by ``parse_cards``."""
+    return json.dumps({"study_cards": card_dicts(cards)}, separators=(",", ":"))
+
+
+def card_dicts(cards: Iterable[CardRecord]) -> List[Dict[str, str]]:
+    """Convert card records to the dictionaries stored in journals and the page index."""
+    return [{"question": card.question, "answer": card.answer} for card in cards]
+
+
+def cards_from_dicts(items: Iterable[Dict[str, Any]]) -> List[CardRecord]:
+    """
+    Rebuild card records from dictionaries written by ``card_dicts``.
+
+    The cards were validated before they were stored, so they are not validated again.
+
+    Raises:
+        KeyError: If a dictionary lacks the question or answer.
+    """
+    return [CardRecord(item["question"], item["answer"]) for item in items]
+
+
+def to_response(cards: Iterable[CardRecord]) -> OpenAIResponse:
+    """Wrap validated card records in the public ``OpenAIResponse`` model without validating them again."""
+    return OpenAIResponse.model_construct(
+        study_cards=[StudyCard.model_construct(question=card.question, answer=card.answer) for card in cards]
+    )
@@ -0,0 +1,85 @@
+# src/utils/concurrency.py
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], max_workers: int) -> Iterator[Tuple[T, Future]]:
+    """
+    Run ``fn`` over ``items`` on a thread pool with at most ``max_workers`` calls in flight.
+
+    Items are pulled from ``items`` lazily, so the iterable may be a generator that produces
+    expensive work on demand. One item beyond the in-flight ones is prefetched while the workers
+    are busy, so producing item k+1 overlaps with processing item k.
+
+    Args:
+        fn (Callable[[T], R]): Function to apply to each item.
+        items (Iterable[T]): Items to process.
+        max_workers (int): Maximum number of concurrent calls.
+
+    Yields:
+        Tuple[T, Future]: Each item together with its finished future, in completion order.
+    """
+    max_workers = max(1, max_workers)
+    it = iter(items)
+    in_flight: Dict[Future, T] = {}
+    prefetched: List[T] = []
+
+    def pull() -> bool:
+        if not prefetched:
+            try:
+                prefetched.append(next(it))
+            except StopIteration:
+                return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def fill():
+            while len(in_flight) < max_workers and pull():
+                item = prefetched.pop()
+                in_flight[executor.submit(fn, item)] = item
+
+        fill()
+        while in_flight:
+            pull()
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield in_flight.pop(future), future
+            fill()
+
+
+class TurnOrder:
+    """
+    Lets threads enter a section one at a time in a fixed order of turns, whatever order they arrive in.
+
+    Turn ``k`` is entered once every earlier turn was taken or skipped, which keeps order-dependent
+    work, such as keeping the first of two duplicates, independent of thread timing.
+    """
+
+    def __init__(self):
+        self._next = 0
+        self._finished: Set[int] = set()
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def turn(self, index: int) -> Iterator[None]:
+        """Wait until every turn before ``index`` is finished, then hold turn ``index`` until the block exits."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._next >= index)
+        try:
+            yield
+        finally:
+            self.finish(index)
+
+    def finish(self, index: int):
+        """Mark turn ``index`` as finished without taking it, e.g. because its work failed; repeated calls are ignored."""
+        with self._condition:
+            self._finished.add(index)
+            while self._next in self._finished:
+                self._next += 1
+            self._condition.notify_all()
@@ -0,0 +1,81 @@
+# src/utils/tokens.py
+
+import math
+from functools import lru_cache
+from typing import Any, Optional
+
+from src.models.page_content import PageContent
+
+try:
+    import tiktoken
+except ImportError:  # Optional: without it, text tokens are estimated from the character count
+    tiktoken = None
+
+# OpenAI vision pricing: a fixed base cost plus a cost per 512px tile at high detail
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+# Fallback when an image's dimensions are unknown: a 500x647 page render, i.e. 2 tiles
+DEFAULT_IMAGE_TOKENS = IMAGE_BASE_TOKENS + 2 * IMAGE_TILE_TOKENS
+
+
+# Tokenizer of the gpt-4o model family
+TOKENIZER_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_tokenizer() -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        # The encoding is downloaded on first use, which fails when offline
+        return None
+
+
+def estimate_text_tokens(text: Optional[str]) -> int:
+    """
+    Estimate the tokens of a text.
+
+    Uses tiktoken when it is installed and falls back to the common ~4 characters per token heuristic.
+    """
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def estimate_image_tokens(width: Optional[int], height: Optional[int], detail: Optional[str] = None) -> int:
+    """
+    Estimate the tokens of an image.
+
+    At low detail an image costs only the base tokens. Otherwise it is scaled to fit within
+    2048x2048 and then so that its short side is at most 768px, after which every 512px tile
+    costs a fixed amount on top of the base cost.
+
+    Args:
+        width (Optional[int]): Image width in pixels.
+        height (Optional[int]): Image height in pixels.
+        detail (Optional[str]): OpenAI image detail level ("auto", "low" or "high").
+
+    Returns:
+        int: Estimated token count.
+    """
+    if detail == "low":
+        return IMAGE_BASE_TOKENS
+    if not width or not height:
+        return DEFAULT_IMAGE_TOKENS
+    scale = min(1.0, 2048 / max(width, height))
+    scale *= min(1.0, 768 / (min(width, height) * scale))
+    tiles = math.ceil(width * scale / 512) * math.ceil(height * scale / 512)
+    return IMAGE_BASE_TOKENS + tiles * IMAGE_TILE_TOKENS
+
+
+def estimate_page_tokens(page: PageContent) -> int:
+    """Estimate the input tokens a page contributes to a request."""
+    tokens = estimate_text_tokens(page.text)
+    if page.image_data:
+        tokens += estimate_image_tokens(page.image_width, page.image_height, page.image_detail)
+    return tokens